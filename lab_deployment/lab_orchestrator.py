@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+# Brings up the QEMU lab of qemu_openwrt_lab.sh (layout "basic": 16 OpenWrt VMs) or
+# lab_deployment_advanced/qemu_openwrt_mikrotik_lab.sh (layout "advanced": 16 seats of
+# OpenWrt + MikroTik) without their one-VM-at-a-time loops:
+# - every VM gets a thin qcow2 overlay backed by the one shared base image instead of a
+#   full copy (a few hundred KB per VM instead of 200 MB)
+# - the current links are read once (ip -j addr) and every missing bridge, TAP and VLAN
+#   of the whole lab is created with a single `ip -batch` call
+# - VMs are started by a bounded pool of workers, each of which creates the overlay,
+#   starts QEMU in a detached screen session (as the scripts do, so `screen -r` still
+#   works) and waits for the VM to boot by watching its serial console log
+# - --dry-run prints every command that would change the host instead of running it
+#   and simulates the VMs, so the whole flow can be tried without KVM or root
+#
+# Base images are prepared as before by the scripts (`qemu_openwrt_lab.sh start` once, or
+# menu option "0) Deploy System" of qemu_openwrt_mikrotik_lab.sh), or passed with --openwrt-image
+# and --mikrotik-image.
+#
+# Usage:
+# - python3 lab_orchestrator.py up --internet
+# - python3 lab_orchestrator.py --layout advanced --ids 9-12 --parallel 4 up --wait boot
+# - python3 lab_orchestrator.py --dry-run up
+# - python3 lab_orchestrator.py status
+# - python3 lab_orchestrator.py down --all
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OPENWRT_VERSION = "23.05.0"
+MIKROTIK_VERSION = "6.40"
+
+# Serial console lines that mean the guest has finished booting
+BOOT_MARKERS = {
+    'openwrt': (b'Please press Enter to activate this console', b'procd: - init complete -'),
+    'mikrotik': (b'MikroTik Login:', b'Login:'),
+}
+_print_lock = threading.Lock()
+
+
+def say(text):
+    """ print() for output that VM workers and the main thread produce at the same time """
+    with _print_lock:
+        print(text, flush=True)
+
+
+class VM:
+    def __init__(self, name, title, os_name, base_image, nics):
+        self.name = name  # screen session name, also used for the overlay and console log
+        self.title = title  # QEMU -name
+        self.os_name = os_name
+        self.base_image = base_image
+        self.nics = nics  # [(netdev id, tap, mac), ...]
+
+
+class Seat:
+    """ Everything one student gets: VMs, bridges, TAPs attached to bridges, VLANs attached to bridges """
+
+    def __init__(self, seat_id):
+        self.id = seat_id
+        self.vms = []
+        self.bridges = []
+        self.taps = []  # (tap, bridge)
+        self.vlans = []  # (interface, vlan id, bridge)
+
+
+class Layout:
+    """ Topology of one of the lab scripts """
+
+    def __init__(self, name, ids, wan_bridge, wan_ip, dhcp_offsets, phy_in_wan, extra_bridges, build_seat):
+        self.name = name
+        self.ids = ids
+        self.wan_bridge = wan_bridge
+        self.wan_ip = wan_ip
+        self.dhcp_offsets = dhcp_offsets  # DHCP range, relative to the last octet of wan_ip
+        self.phy_in_wan = phy_in_wan
+        self.extra_bridges = extra_bridges
+        self.build_seat = build_seat
+
+
+def basic_seat(seat_id, args):
+    """ qemu_openwrt_lab.sh: one OpenWrt VM, LAN bridge br-lan-N with VLAN 200+N of the physical interface """
+    seat = Seat(seat_id)
+    lan_bridge = f"br-lan-{seat_id}"
+    vlan_id = 201 + seat_id - 1
+    seat.bridges.append(lan_bridge)
+    seat.vlans.append((f"{args.phy_if}.{vlan_id}", vlan_id, lan_bridge))
+    seat.taps += [(f"tap{seat_id}_wan", args.layout.wan_bridge), (f"tap{seat_id}_lan", lan_bridge)]
+    seat.vms.append(VM(f"openwrt_vm_{seat_id}", f"openwrt_vm_{seat_id}", 'openwrt', args.openwrt_image, [
+        (f"net{seat_id}_lan", f"tap{seat_id}_lan", f"52:54:00:{seat_id:02x}:00:01"),
+        (f"net{seat_id}_wan", f"tap{seat_id}_wan", f"52:54:00:{seat_id:02x}:00:02"),
+    ]))
+    return seat
+
+
+def advanced_seat(seat_id, args):
+    """ qemu_openwrt_mikrotik_lab.sh: OpenWrt (WAN side) and MikroTik joined by br-net-N, MikroTik LAN on
+    br-lan-N with VLAN 200+N of the physical interface """
+    seat = Seat(seat_id)
+    net_bridge, lan_bridge = f"br-net-{seat_id}", f"br-lan-{seat_id}"
+    vlan_id = 200 + seat_id
+    seat.bridges += [net_bridge, lan_bridge]
+    seat.vlans.append((f"{args.phy_if}.{vlan_id}", vlan_id, lan_bridge))
+    seat.taps += [
+        (f"tap-{seat_id}-1-wan", args.layout.wan_bridge),
+        (f"tap-{seat_id}-1-lan", net_bridge),
+        (f"tap-{seat_id}-2-wan", net_bridge),
+        (f"tap-{seat_id}-2-lan", lan_bridge),
+    ]
+    seat.vms.append(VM(f"vm_{seat_id}-1-openwrt", f"OpenWrt {seat_id}", 'openwrt', args.openwrt_image, [
+        ("net1_lan", f"tap-{seat_id}-1-lan", f"52:54:00:{seat_id:02x}:01:01"),
+        ("net1_wan", f"tap-{seat_id}-1-wan", f"52:54:00:{seat_id:02x}:01:02"),
+    ]))
+    seat.vms.append(VM(f"vm_{seat_id}-2-mikrotik", f"MikroTik {seat_id}", 'mikrotik', args.mikrotik_image, [
+        ("net1_lan", f"tap-{seat_id}-2-lan", f"00:0C:42:{seat_id:02x}:02:01"),
+        ("net1_wan", f"tap-{seat_id}-2-wan", f"00:0C:42:{seat_id:02x}:02:02"),
+    ]))
+    return seat
+
+
+LAYOUTS = {
+    'basic': Layout('basic', list(range(1, 17)), 'br-wan', '192.168.100.1/24', (9, 49),
+                    phy_in_wan=True, extra_bridges=['br-lan'], build_seat=basic_seat),
+    'advanced': Layout('advanced', list(range(9, 25)), 'br-wan', '172.16.1.1/24', (100, 110),
+                       phy_in_wan=False, extra_bridges=[], build_seat=advanced_seat),
+}
+DEFAULT_IMAGES = {
+    'basic': (os.path.join(SCRIPT_DIR, f"openwrt-{OPENWRT_VERSION}-x86-64-generic-ext4-combined.qcow2"), None),
+    'advanced': (os.path.join(SCRIPT_DIR, '..', 'lab_deployment_advanced', f"openwrt-{OPENWRT_VERSION}.qcow2"),
+                 os.path.join(SCRIPT_DIR, '..', 'lab_deployment_advanced', f"mikrotik-{MIKROTIK_VERSION}.qcow2")),
+}
+
+
+class SystemBackend:
+    """ Runs commands on this host (through sudo when not root) """
+
+    dry_run = False
+
+    def __init__(self):
+        self.sudo = [] if os.geteuid() == 0 else ['sudo']
+
+    def run(self, cmd, input=None, privileged=True, check=True):
+        """ Runs a command that changes the host """
+        result = subprocess.run((self.sudo if privileged else []) + cmd, input=input, text=True,
+                                capture_output=True)
+        if check and result.returncode != 0:
+            raise RuntimeError(f"{' '.join(cmd)} failed: {result.stderr.strip()}")
+        return result
+
+    def query(self, cmd, privileged=False):
+        """ Runs a read-only command and returns its output, or '' if it fails """
+        try:
+            result = subprocess.run((self.sudo if privileged else []) + cmd, text=True, capture_output=True)
+        except FileNotFoundError:
+            return ''
+        return result.stdout if result.returncode == 0 else ''
+
+    def sessions(self):
+        """ Names of the running screen sessions """
+        names = set()
+        for line in self.query(['screen', '-ls'], privileged=True).splitlines():
+            parts = line.split()
+            if parts and '.' in parts[0] and parts[0].split('.', 1)[0].isdigit():
+                names.add(parts[0].split('.', 1)[1])
+        return names
+
+    def wait_for_boot(self, vm, log_path, markers, timeout):
+        """ Waits until the serial console log contains one of `markers` """
+        deadline = time.monotonic() + timeout
+        offset, tail = 0, b''
+        while time.monotonic() < deadline:
+            try:
+                with open(log_path, 'rb') as f:
+                    f.seek(offset)
+                    data = f.read()
+            except OSError:
+                data = b''
+            if data:
+                offset += len(data)
+                window = tail + data
+                if any(marker in window for marker in markers):
+                    return True
+                tail = window[-256:]
+            time.sleep(0.5)
+        return False
+
+
+class DryRunBackend(SystemBackend):
+    """ Prints the commands that would change the host; reads the real host state when it can """
+
+    dry_run = True
+
+    def __init__(self):
+        super().__init__()
+        self.sudo = []
+        self.started = set()
+
+    def run(self, cmd, input=None, privileged=True, check=True):
+        lines = [' '.join(cmd)] + [f"  {line}" for line in (input or '').splitlines()]
+        say('\n'.join(f"[dry-run] {line}" for line in lines))
+        if cmd[:2] == ['screen', '-dmS']:
+            self.started.add(cmd[2])
+        return subprocess.CompletedProcess(cmd, 1 if cmd[:1] == ['iptables'] and '-C' in cmd else 0, '', '')
+
+    def sessions(self):
+        return set(self.started)
+
+    def wait_for_boot(self, vm, log_path, markers, timeout):
+        return True
+
+
+def read_links(backend):
+    """ name -> {'master': bridge or None, 'up': bool, 'addresses': [...]}, from one `ip -j addr` call """
+    output = backend.query(['ip', '-j', 'addr', 'show'])
+    links = {}
+    for link in json.loads(output) if output.strip() else []:
+        links[link['ifname'].split('@')[0]] = {
+            'master': link.get('master'),
+            'up': 'UP' in link.get('flags', []),
+            'addresses': [f"{a['local']}/{a['prefixlen']}" for a in link.get('addr_info', [])],
+        }
+    return links
+
+
+def network_up_commands(args, seats, links):
+    """ `ip -batch` lines creating every missing bridge, TAP and VLAN of the lab and attaching them """
+    layout = args.layout
+    commands = []
+
+    def bridge(name):
+        if name not in links:
+            commands.append(f"link add name {name} type bridge")
+            links[name] = {'master': None, 'up': False, 'addresses': []}
+        if not links[name]['up']:
+            commands.append(f"link set dev {name} up")
+
+    def attach(name, master):
+        if links[name]['master'] != master:
+            commands.append(f"link set dev {name} master {master}")
+        if not links[name]['up']:
+            commands.append(f"link set dev {name} up")
+
+    bridge(layout.wan_bridge)
+    for name in layout.extra_bridges:
+        bridge(name)
+    if layout.phy_in_wan and args.phy_if in links:
+        attach(args.phy_if, layout.wan_bridge)
+    if layout.wan_ip not in links[layout.wan_bridge]['addresses']:
+        commands.append(f"addr add {layout.wan_ip} dev {layout.wan_bridge}")
+
+    for seat in seats:
+        for name in seat.bridges:
+            bridge(name)
+        for name, master in seat.taps:
+            if name not in links:
+                commands.append(f"tuntap add dev {name} mode tap")
+                links[name] = {'master': None, 'up': False, 'addresses': []}
+            attach(name, master)
+        for name, vlan_id, master in seat.vlans:
+            if name not in links:
+                commands.append(f"link add link {args.phy_if} name {name} type vlan id {vlan_id}")
+                links[name] = {'master': None, 'up': False, 'addresses': []}
+            attach(name, master)
+    return commands
+
+
+def network_down_commands(args, seats, links, everything=False):
+    """ `ip -batch` lines deleting the seats' TAPs, VLANs and bridges (and the shared bridges with `everything`) """
+    names = []
+    for seat in seats:
+        names += [name for name, _ in seat.taps] + [name for name, _, _ in seat.vlans] + seat.bridges
+    commands = []
+    if everything:
+        if args.layout.phy_in_wan and links.get(args.phy_if, {}).get('master') == args.layout.wan_bridge:
+            commands.append(f"link set dev {args.phy_if} nomaster")
+        names += [args.layout.wan_bridge] + args.layout.extra_bridges
+    commands += [f"link delete dev {name}" for name in names if name in links]
+    return commands
+
+
+def apply_ip_batch(backend, commands):
+    if commands:
+        # -force: keep going if one line fails (e.g. an interface removed behind our back)
+        result = backend.run(['ip', '-force', '-batch', '-'], input='\n'.join(commands) + '\n', check=False)
+        if result.returncode != 0:
+            print(f"Some network changes failed:\n{result.stderr.strip()}")
+
+
+def overlay_path(args, vm):
+    return os.path.join(args.vm_dir, f"{vm.name}.qcow2")
+
+
+def console_log_path(args, vm):
+    return os.path.join(args.vm_dir, f"{vm.name}.console.log")
+
+
+def qemu_command(args, vm):
+    cmd = [
+        'qemu-system-x86_64',
+        '-name', vm.title,
+        '-m', args.memory,
+        '-drive', f"file={overlay_path(args, vm)},format=qcow2,id=d0,if=none,bus=0,unit=0"
+                  + (",snapshot=on" if args.snapshot else ''),
+        '-device', 'ide-hd,drive=d0,bus=ide.0',
+    ]
+    for netdev, tap, mac in vm.nics:
+        index, kind = netdev[len('net'):].split('_')  # net1_lan -> device lan1, as in the scripts
+        cmd += ['-netdev', f"tap,id={netdev},ifname={tap},script=no,downscript=no",
+                '-device', f"virtio-net-pci,netdev={netdev},id={kind}{index},mac={mac}"]
+    # Same console as -nographic (serial and monitor on the terminal, Ctrl-A c to switch), plus a log for the boot probe
+    cmd += ['-display', 'none',
+            '-chardev', f"stdio,id=console,mux=on,logfile={console_log_path(args, vm)}",
+            '-serial', 'chardev:console', '-mon', 'chardev=console,mode=readline']
+    if args.kvm:
+        cmd.append('-enable-kvm')
+    return cmd
+
+
+def create_overlay(backend, args, vm):
+    """ Thin qcow2 overlay backed by the shared base image; kept across restarts unless --fresh """
+    path = overlay_path(args, vm)
+    if os.path.exists(path) and not args.fresh:
+        return False
+    base = os.path.abspath(vm.base_image)
+    backend.run(['qemu-img', 'create', '-q', '-f', 'qcow2', '-F', 'qcow2', '-b', base, path], privileged=False)
+    return True
+
+
+def start_vm(backend, args, vm):
+    """ Creates the overlay, starts QEMU in a screen session and waits for it according to --wait; returns a status line """
+    started = time.monotonic()
+    if vm.name in backend.sessions():
+        return f"{vm.name}: already running"
+    created = create_overlay(backend, args, vm)
+    if not backend.dry_run and os.path.exists(console_log_path(args, vm)):
+        os.unlink(console_log_path(args, vm))
+    backend.run(['screen', '-dmS', vm.name] + qemu_command(args, vm))
+
+    if args.wait == 'none':
+        return f"{vm.name}: launched"
+    deadline = time.monotonic() + 10
+    while vm.name not in backend.sessions():
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"{vm.name}: QEMU exited right after start, run it by hand to see why")
+        time.sleep(0.2)
+    if args.wait == 'boot':
+        if not backend.wait_for_boot(vm, console_log_path(args, vm), BOOT_MARKERS[vm.os_name], args.boot_timeout):
+            return f"{vm.name}: running, no boot prompt after {args.boot_timeout}s"
+        return f"{vm.name}: booted in {time.monotonic() - started:.1f}s{' (new overlay)' if created else ''}"
+    return f"{vm.name}: started{' (new overlay)' if created else ''}"
+
+
+def stop_vm(backend, vm, sessions):
+    if vm.name in sessions:
+        backend.run(['screen', '-S', vm.name, '-X', 'quit'], check=False)
+        return f"{vm.name}: stopped"
+    return f"{vm.name}: not running"
+
+
+def dhcp_and_nat(backend, args, enable):
+    """ dnsmasq on the WAN bridge, and NAT/forwarding to the Internet interface, like the scripts' internet commands """
+    layout = args.layout
+    address = layout.wan_ip.split('/')[0]
+    prefix, last = address.rsplit('.', 1)
+    start, end = (f"{prefix}.{int(last) + offset}" for offset in layout.dhcp_offsets)
+    active_if = args.active_if or default_route_interface(backend)
+    rules = [
+        (['-t', 'nat'], 'POSTROUTING', ['-o', active_if, '-j', 'MASQUERADE']),
+        ([], 'FORWARD', ['-m', 'physdev', '--physdev-is-bridged', '-j', 'ACCEPT']),
+        ([], 'FORWARD', ['-i', layout.wan_bridge, '-o', active_if, '-j', 'ACCEPT']),
+        ([], 'FORWARD', ['-i', active_if, '-o', layout.wan_bridge, '-m', 'state', '--state',
+                         'RELATED,ESTABLISHED', '-j', 'ACCEPT']),
+    ]
+    sessions = backend.sessions()
+    if enable:
+        if 'dnsmasq' not in sessions:
+            backend.run(['screen', '-dmS', 'dnsmasq', 'dnsmasq', f"--interface={layout.wan_bridge}",
+                         '--bind-interfaces', f"--listen-address={address}",
+                         f"--dhcp-range={start},{end},12h", '--no-daemon'])
+        for table, chain, rule in rules:
+            if backend.run(['iptables'] + table + ['-C', chain] + rule, check=False).returncode != 0:
+                backend.run(['iptables'] + table + ['-A', chain] + rule)
+        backend.run(['sysctl', '-qw', 'net.ipv4.ip_forward=1'])
+        print(f"DHCP {start}-{end} on {layout.wan_bridge}, NAT through {active_if}")
+    else:
+        if 'dnsmasq' in sessions:
+            backend.run(['screen', '-S', 'dnsmasq', '-X', 'quit'], check=False)
+        for table, chain, rule in rules:
+            if backend.run(['iptables'] + table + ['-C', chain] + rule, check=False).returncode == 0:
+                backend.run(['iptables'] + table + ['-D', chain] + rule, check=False)
+        print("DHCP and NAT stopped")
+
+
+def default_route_interface(backend):
+    for route in json.loads(backend.query(['ip', '-j', 'route', 'show', 'default']) or '[]'):
+        if route.get('dev'):
+            return route['dev']
+    raise SystemExit("Could not determine the active Internet interface, pass --active-if")
+
+
+def parse_ids(text):
+    """ '1-16', '9,10,12-14' -> [1, ..., 16], [9, 10, 12, 13, 14] """
+    ids = []
+    for part in text.split(','):
+        first, _, last = part.partition('-')
+        ids += range(int(first), int(last or first) + 1)
+    return ids
+
+
+def check_tools(backend, names):
+    missing = [name for name in names if shutil.which(name) is None]
+    if missing and not backend.dry_run:
+        raise SystemExit(f"Error: not installed: {', '.join(missing)}")
+
+
+def up(backend, args, seats):
+    vms = [vm for seat in seats for vm in seat.vms]
+    for image in sorted({vm.base_image for vm in vms}):
+        if not os.path.isfile(image) and not backend.dry_run:
+            raise SystemExit(f"Base image {image} not found; prepare it with the lab script first "
+                             f"or pass --openwrt-image/--mikrotik-image")
+    if not backend.dry_run:
+        os.makedirs(args.vm_dir, exist_ok=True)
+
+    started = time.monotonic()
+    apply_ip_batch(backend, network_up_commands(args, seats, read_links(backend)))
+    print(f"Network ready in {time.monotonic() - started:.2f}s")
+    if args.internet:
+        dhcp_and_nat(backend, args, True)
+
+    failures = 0
+    with ThreadPoolExecutor(max_workers=args.parallel) as pool:
+        futures = {pool.submit(start_vm, backend, args, vm): vm for vm in vms}
+        for future in as_completed(futures):
+            try:
+                say(future.result())
+            except Exception as e:
+                failures += 1
+                say(f"{futures[future].name}: {e}")
+    print(f"{len(vms) - failures}/{len(vms)} VMs up in {time.monotonic() - started:.1f}s")
+    if failures:
+        sys.exit(1)
+
+
+def down(backend, args, seats):
+    sessions = backend.sessions()
+    for seat in seats:
+        for vm in seat.vms:
+            print(stop_vm(backend, vm, sessions))
+    if args.all:
+        dhcp_and_nat(backend, args, False)
+    apply_ip_batch(backend, network_down_commands(args, seats, read_links(backend), everything=args.all))
+    if args.remove_overlays:
+        for seat in seats:
+            for vm in seat.vms:
+                for path in (overlay_path(args, vm), console_log_path(args, vm)):
+                    if os.path.exists(path):
+                        if backend.dry_run:
+                            print(f"[dry-run] rm {path}")
+                        else:
+                            os.unlink(path)
+
+
+def status(backend, args, seats):
+    sessions = backend.sessions()
+    links = read_links(backend)
+    print(f"dnsmasq: {'running' if 'dnsmasq' in sessions else 'not running'}")
+    for seat in seats:
+        missing = [name for name, _ in seat.taps if name not in links]
+        for vm in seat.vms:
+            overlay = overlay_path(args, vm)
+            size = f"{os.path.getsize(overlay) / 1024:.0f} KiB overlay" if os.path.exists(overlay) else 'no overlay'
+            state = 'running' if vm.name in sessions else 'stopped'
+            print(f"{vm.name}: {state}, {size}" + (f", missing {', '.join(missing)}" if missing else ''))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Brings up the QEMU OpenWrt/MikroTik lab concurrently')
+    parser.add_argument('--layout', choices=LAYOUTS, default='basic',
+                        help='basic: qemu_openwrt_lab.sh, advanced: qemu_openwrt_mikrotik_lab.sh (default: basic)')
+    parser.add_argument('--ids', help='Seats, e.g. 1-16 or 9,10,12 (default: all seats of the layout)')
+    parser.add_argument('--phy-if', default='eth0', help='Physical interface carrying the VLANs (default: eth0)')
+    parser.add_argument('--active-if', help='Internet interface for NAT (default: the default route interface)')
+    parser.add_argument('--vm-dir', default=os.path.join(SCRIPT_DIR, 'vms'),
+                        help='Directory for overlays and console logs (default: vms/ next to this script)')
+    parser.add_argument('--openwrt-image', help='OpenWrt base qcow2 image')
+    parser.add_argument('--mikrotik-image', help='MikroTik base qcow2 image (advanced layout)')
+    parser.add_argument('--parallel', type=int, default=8, help='VMs started at the same time (default: 8)')
+    parser.add_argument('--dry-run', action='store_true', help='Print the commands instead of running them')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    up_parser = commands.add_parser('up', help='Create the network and start the VMs')
+    up_parser.add_argument('--wait', choices=['none', 'started', 'boot'], default='boot',
+                           help='Wait for each VM to be started or to show its login prompt (default: boot)')
+    up_parser.add_argument('--boot-timeout', type=float, default=180, help='Seconds to wait for a boot (default: 180)')
+    up_parser.add_argument('--fresh', action='store_true', help='Recreate the overlays, discarding changes made in the VMs')
+    up_parser.add_argument('--snapshot', action='store_true',
+                           help='Do not write to the overlays at all (snapshot=on, like WRITABLE=0)')
+    up_parser.add_argument('--memory', default='128M', help='Memory per VM (default: 128M)')
+    up_parser.add_argument('--no-kvm', dest='kvm', action='store_false', help='Run without -enable-kvm')
+    up_parser.add_argument('--internet', action='store_true', help='Also start DHCP and NAT on the WAN bridge')
+
+    down_parser = commands.add_parser('down', help='Stop the VMs and delete their network interfaces')
+    down_parser.add_argument('--all', action='store_true', help='Also remove the WAN bridge, DHCP and NAT')
+    down_parser.add_argument('--remove-overlays', action='store_true', help='Also delete the overlays and console logs')
+
+    internet_parser = commands.add_parser('internet', help='Start or stop DHCP and NAT on the WAN bridge')
+    internet_parser.add_argument('state', choices=['on', 'off'])
+
+    commands.add_parser('status', help='Show which VMs are running')
+
+    args = parser.parse_args()
+    args.layout = LAYOUTS[args.layout]
+    default_openwrt, default_mikrotik = DEFAULT_IMAGES[args.layout.name]
+    args.openwrt_image = args.openwrt_image or default_openwrt
+    args.mikrotik_image = args.mikrotik_image or default_mikrotik
+    seat_ids = parse_ids(args.ids) if args.ids else args.layout.ids
+
+    backend = DryRunBackend() if args.dry_run else SystemBackend()
+    check_tools(backend, ['ip', 'screen', 'qemu-img', 'qemu-system-x86_64'])
+    if args.command == 'internet' or getattr(args, 'internet', False):
+        check_tools(backend, ['iptables', 'dnsmasq'])
+    seats = [args.layout.build_seat(seat_id, args) for seat_id in seat_ids]
+
+    if args.command == 'up':
+        up(backend, args, seats)
+    elif args.command == 'down':
+        down(backend, args, seats)
+    elif args.command == 'internet':
+        dhcp_and_nat(backend, args, args.state == 'on')
+    else:
+        status(backend, args, seats)
@@ -0,0 +1,462 @@
+# Load generator and scan-replay benchmark for the honeypot and the Flask lab tools.
+#
+# Every service is started on loopback in a temporary working directory (so
+# logs.csv, saved_data/ and auth logs do not end up in the repository) and
+# driven with a configurable number of concurrent clients. Scenarios:
+#
+#   get        - plain GET/POST requests against the service's usual paths
+#   slowloris  - the same load while slow clients trickle headers byte by byte
+#   hold       - the same load while held clients keep connections open the way an
+#                open page does: an event stream for services that have one, else an
+#                idle keep-alive connection after one request
+#   garbage    - random bytes, non-UTF-8 and oversized requests
+#   replay     - requests replayed from a capture (JSON Lines, see README.md)
+#
+# For every run the script reports requests/sec, p50/p95/p99 latency, errors,
+# RSS growth and open file descriptors of the service, and writes everything
+# to a JSON file so two revisions can be compared with `bench.py compare`.
+#
+# Usage:
+# - python3 bench.py run --service honeypot --concurrency 200 --duration 10 -o results.json
+# - python3 bench.py run --service all --scenario get --scenario garbage
+# - python3 bench.py run --service honeypot --replay captured.jsonl
+# - python3 bench.py compare old.json new.json
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+SERVICES = {
+    'honeypot': {
+        'command': lambda port, workdir: [
+            sys.executable, os.path.join(REPO_DIR, 'tricks', 'honeypot_CSS326-24G-2S+.py'),
+            '--host', '127.0.0.1', '--port', str(port), '-o', os.path.join(workdir, 'auth_log.txt')],
+        'requests': [('GET', '/index.html', None), ('GET', '/sys.b', None), ('GET', '/', None),
+                     ('POST', '/sys.b', 'user=admin&password=admin')],
+    },
+    'show_ip_browser_info': {
+        'command': lambda port, workdir: [
+            sys.executable, os.path.join(REPO_DIR, 'scripts', 'show_ip_browser_info', 'app_mac_csv.py'),
+            '--host', '127.0.0.1', '--port', str(port)],
+        'requests': [('GET', '/', None), ('GET', '/some/path', None)],
+        'stream': '/_logs/stream',
+    },
+    'md_report': {
+        'command': lambda port, workdir: [
+            sys.executable, os.path.join(REPO_DIR, 'scripts', 'md_report', 'app.py'),
+            '--host', '127.0.0.1', '--port', str(port)],
+        'requests': [('GET', '/', None),
+                     ('POST', '/', 'name=bench&preview=1&markdown_text=' + '%23+Report%0A%0A' + 'Some+text.%0A' * 200)],
+    },
+}
+
+
+def build_request(method, path, body=None, user_agent='cyberlab-bench/1.0', headers=(), connection='close'):
+    lines = [f"{method} {path} HTTP/1.1", "Host: 127.0.0.1", f"User-Agent: {user_agent}", f"Connection: {connection}"]
+    lines += [f"{name}: {value}" for name, value in headers]
+    data = body.encode('utf-8') if body else b''
+    if body is not None:
+        lines += ["Content-Type: application/x-www-form-urlencoded", f"Content-Length: {len(data)}"]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode('utf-8') + data
+
+
+def garbage_requests():
+    """ Malformed requests a scanner or fuzzer might send """
+    yield bytes(random.getrandbits(8) for _ in range(random.randint(1, 2048)))
+    yield b'\x16\x03\x01\x02\x00\x01\x00\x01\xfc\x03\x03' + os.urandom(64)  # TLS ClientHello to an HTTP port
+    yield b'GET /\xff\xfe\xfd HTTP/1.1\r\nUser-Agent: \xc3\x28\xa0\xa1\r\n\r\n'
+    yield b'GET / HTTP/1.1\r\n' + b'X-Padding: ' + b'A' * 65536 + b'\r\n\r\n'
+    yield b'GET / HTTP/1.1\r\nUser-Agent:NoSpace\r\n\r\n'
+    yield b'POST / HTTP/1.1\r\nContent-Length: -1\r\n\r\n'
+    yield b'\r\n\r\n'
+    yield b'OPTIONS * HTTP/1.1\r\n\r\n'
+
+
+def load_replay(path):
+    """ Reads captured requests: raw ones ('request' or 'request_b64') or honeypot auth log records """
+    requests = []
+    with open(path, encoding='utf-8', errors='backslashreplace') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            if 'request_b64' in record:
+                requests.append(base64.b64decode(record['request_b64']))
+            elif 'request' in record:
+                requests.append(record['request'].encode('utf-8', 'surrogateescape'))
+            elif 'method' in record and 'uri' in record:
+                headers = []
+                if (record.get('authorization') or '').startswith(('Digest', 'Basic')):
+                    headers.append(('Authorization', record['authorization']))
+                requests.append(build_request(record['method'], record['uri'], record.get('body') or None,
+                                              user_agent=record.get('user_agent', ''), headers=headers))
+    return requests
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def process_tree(pid):
+    """ The pid and all its descendants (Linux only) """
+    pids = [pid]
+    for current in pids:
+        try:
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children') as f:
+                    pids += [int(child) for child in f.read().split()]
+        except OSError:
+            pass
+    return pids
+
+
+def resource_usage(pid):
+    """ Total RSS in kB and open file descriptors of a process tree, or (None, None) """
+    rss, fds = 0, 0
+    try:
+        for current in process_tree(pid):
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        rss += int(line.split()[1])
+            fds += len(os.listdir(f'/proc/{current}/fd'))
+    except OSError:
+        return None, None
+    return rss, fds
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = {}
+        self.status = {}
+
+    def error(self, kind):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+
+async def send_one(host, port, payload, stats, timeout):
+    started = time.perf_counter()
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        writer.write(payload)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+        if not response:
+            stats.error('closed_without_response')
+            return
+        status_line = response.split(b'\r\n', 1)[0].split()
+        code = status_line[1].decode('ascii', 'replace') if len(status_line) > 1 else 'invalid'
+        stats.status[code] = stats.status.get(code, 0) + 1
+        stats.latencies.append((time.perf_counter() - started) * 1000)
+    except asyncio.TimeoutError:
+        stats.error('timeout')
+    except ConnectionRefusedError:
+        stats.error('refused')
+    except ConnectionResetError:
+        stats.error('reset')
+    except OSError as e:
+        stats.error(type(e).__name__)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def drive(host, port, payloads, concurrency, duration, timeout):
+    """ Sends payloads round-robin from `concurrency` clients for `duration` seconds """
+    stats = Stats()
+    deadline = time.monotonic() + duration
+    counter = iter(range(sys.maxsize))
+
+    async def client():
+        while time.monotonic() < deadline:
+            payload = payloads[next(counter) % len(payloads)]
+            await send_one(host, port, payload, stats, timeout)
+
+    started = time.monotonic()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return stats, time.monotonic() - started
+
+
+async def slow_client(host, port, payload, stop, closed):
+    """ Opens a connection and sends the request one byte per second until stopped """
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return
+    try:
+        for byte in payload:
+            if stop.is_set():
+                return
+            writer.write(bytes([byte]))
+            await writer.drain()
+            try:
+                if await asyncio.wait_for(reader.read(1), 1.0) == b'':
+                    closed.append(1)  # the server gave up on us
+                    return
+            except asyncio.TimeoutError:
+                pass
+    except OSError:
+        closed.append(1)
+    finally:
+        writer.close()
+
+
+async def held_client(host, port, payload, stop, opened, closed):
+    """ Sends one request and keeps the connection open until stopped, reading whatever arrives """
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return
+    try:
+        writer.write(payload)
+        await writer.drain()
+        answered = False
+        while not stop.is_set():
+            try:
+                data = await asyncio.wait_for(reader.read(65536), 0.5)
+            except asyncio.TimeoutError:
+                continue
+            if not data:
+                closed.append(1)
+                return
+            if not answered:
+                answered = True
+                opened.append(1)
+    except OSError:
+        closed.append(1)
+    finally:
+        writer.close()
+
+
+async def run_scenario(scenario, host, port, payloads, args, pid, hold_payload=None):
+    sampled = {'fds_max': 0}
+
+    async def sampler(stop):
+        while not stop.is_set():
+            _, fds = resource_usage(pid) if pid else (None, None)
+            if fds is not None:
+                sampled['fds_max'] = max(sampled['fds_max'], fds)
+            await asyncio.sleep(0.2)
+
+    rss_start, fds_start = resource_usage(pid) if pid else (None, None)
+    stop = asyncio.Event()
+    sampler_task = asyncio.create_task(sampler(stop))
+    extra = {}
+
+    if scenario == 'slowloris':
+        closed = []
+        slow = [asyncio.create_task(slow_client(host, port, payloads[0], stop, closed))
+                for _ in range(args.slow_clients)]
+        stats, elapsed = await drive(host, port, payloads, args.concurrency, args.duration, args.timeout)
+        stop.set()
+        await asyncio.gather(*slow)
+        extra = {'slow_clients': args.slow_clients, 'slow_clients_closed_by_server': len(closed)}
+    elif scenario == 'hold':
+        opened, closed = [], []
+        held = [asyncio.create_task(held_client(host, port, hold_payload, stop, opened, closed))
+                for _ in range(args.held_clients)]
+        await asyncio.sleep(0.5)  # let the held connections get their answer before the load starts
+        stats, elapsed = await drive(host, port, payloads, args.concurrency, args.duration, args.timeout)
+        stop.set()
+        await asyncio.gather(*held)
+        extra = {'held_clients': args.held_clients, 'held_clients_answered': len(opened),
+                 'held_clients_closed_by_server': len(closed)}
+    else:
+        stats, elapsed = await drive(host, port, payloads, args.concurrency, args.duration, args.timeout)
+
+    stop.set()
+    await sampler_task
+    rss_end, fds_end = resource_usage(pid) if pid else (None, None)
+
+    if scenario == 'garbage':
+        # The interesting question is whether the service survived
+        probe = Stats()
+        await send_one(host, port, build_request('GET', '/'), probe, args.timeout)
+        extra['alive_after'] = bool(probe.latencies)
+
+    latencies = sorted(stats.latencies)
+    return dict({
+        'scenario': scenario,
+        'concurrency': args.concurrency,
+        'duration': round(elapsed, 3),
+        'requests': len(latencies),
+        'errors': stats.errors,
+        'status': stats.status,
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0,
+        'latency_ms': {name: None if percentile(latencies, p) is None else round(percentile(latencies, p), 2)
+                       for name, p in (('p50', 50), ('p95', 95), ('p99', 99), ('max', 100))},
+        'rss_kb': {'start': rss_start, 'end': rss_end,
+                   'growth': None if rss_start is None or rss_end is None else rss_end - rss_start},
+        'fds': {'start': fds_start, 'max': max(sampled['fds_max'], fds_start or 0) if pid else None, 'end': fds_end},
+    }, **extra)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(host, port, process, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Service exited with status {process.returncode}")
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Service did not start listening on {host}:{port}")
+
+
+def bench_service(name, args, replay):
+    service = SERVICES[name]
+    payloads = [build_request(method, path, body) for method, path, body in service['requests']]
+    scenarios = args.scenario or ['get', 'slowloris', 'hold', 'garbage'] + (['replay'] if replay else [])
+    if service.get('stream'):
+        hold_payload = build_request('GET', service['stream'], headers=[('Accept', 'text/event-stream')])
+    else:
+        method, path, body = service['requests'][0]
+        hold_payload = build_request(method, path, body, connection='keep-alive')
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix=f'bench-{name}-') as workdir:
+        port = free_port()
+        process = subprocess.Popen(service['command'](port, workdir), cwd=workdir,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_ready('127.0.0.1', port, process)
+            for scenario in scenarios:
+                if scenario == 'garbage':
+                    scenario_payloads = list(garbage_requests())
+                elif scenario == 'replay':
+                    if not replay:
+                        continue
+                    scenario_payloads = replay
+                else:
+                    scenario_payloads = payloads
+                result = asyncio.run(run_scenario(scenario, '127.0.0.1', port, scenario_payloads, args, process.pid,
+                                                  hold_payload))
+                result['service'] = name
+                results.append(result)
+                print_result(result)
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    return results
+
+
+def print_result(result):
+    latency = result['latency_ms']
+    errors = sum(result['errors'].values())
+    growth = result['rss_kb']['growth']
+    growth = 'n/a' if growth is None else f"{growth:+}"
+    print(f"{result['service']:<22} {result['scenario']:<10} {result['rps']:>9} req/s  "
+          f"p50 {latency['p50']} ms  p95 {latency['p95']} ms  p99 {latency['p99']} ms  "
+          f"errors {errors}  rss {growth} kB  fds max {result['fds']['max']}")
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    previous = {(r['service'], r['scenario']): r for r in old['results']}
+    print(f"{old.get('revision')} -> {new.get('revision')}")
+    for result in new['results']:
+        before = previous.get((result['service'], result['scenario']))
+        if before is None:
+            continue
+        rows = [('req/s', before['rps'], result['rps'])]
+        rows += [(f"{p} ms", before['latency_ms'][p], result['latency_ms'][p]) for p in ('p50', 'p95', 'p99')]
+        rows.append(('errors', sum(before['errors'].values()), sum(result['errors'].values())))
+        print(f"{result['service']} / {result['scenario']}")
+        for label, a, b in rows:
+            change = f"{(b - a) / a * 100:+.1f}%" if a and b is not None else ''
+            print(f"  {label:<8} {a!s:>10} -> {b!s:<10} {change}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the honeypot and the Flask lab tools on loopback')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='Run the benchmark')
+    run.add_argument('--service', action='append', choices=list(SERVICES) + ['all'],
+                     help='Service to benchmark, may be repeated (default: all)')
+    run.add_argument('--scenario', action='append', choices=['get', 'slowloris', 'hold', 'garbage', 'replay'],
+                     help='Scenario to run, may be repeated (default: all that apply)')
+    run.add_argument('-c', '--concurrency', type=int, default=50, help='Concurrent clients (default: 50)')
+    run.add_argument('-d', '--duration', type=float, default=10.0, help='Seconds per scenario (default: 10)')
+    run.add_argument('--timeout', type=float, default=10.0, help='Per-request timeout in seconds (default: 10)')
+    run.add_argument('--slow-clients', type=int, default=200,
+                     help='Slow clients in the slowloris scenario (default: 200)')
+    run.add_argument('--held-clients', type=int, default=50,
+                     help='Connections held open in the hold scenario (default: 50)')
+    run.add_argument('--replay', help='JSON Lines file with captured requests or honeypot log records')
+    run.add_argument('-o', '--output', default='bench_results.json',
+                     help='Where to write the results (default: ./bench_results.json)')
+
+    cmp = commands.add_parser('compare', help='Compare two result files')
+    cmp.add_argument('old')
+    cmp.add_argument('new')
+
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        compare(args.old, args.new)
+        sys.exit(0)
+
+    services = args.service or ['all']
+    if 'all' in services:
+        services = list(SERVICES)
+    replay = load_replay(args.replay) if args.replay else None
+
+    report = {
+        'revision': git_revision(),
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'results': [],
+    }
+    for name in services:
+        try:
+            report['results'] += bench_service(name, args, replay)
+        except RuntimeError as e:
+            print(f"{name}: {e}")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
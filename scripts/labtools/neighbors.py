@@ -0,0 +1,146 @@
+# Shared IP -> MAC resolver for the lab tools (md_report, show_ip_browser_info and
+# the honeypot in tricks/).
+#
+# Instead of forking `arp -n <ip>` for every request, the whole kernel neighbour
+# table is read from /proc/net/arp in one go and cached for a short time. IP
+# addresses are matched exactly, so 10.0.0.1 can no longer pick up the entry of
+# 10.0.0.10, and addresses that are not in the table are remembered as misses
+# for a few seconds so repeated requests from them do not trigger new reads.
+# On systems without /proc (e.g. macOS) a single `arp -an` is used per refresh.
+
+import os
+import re
+import subprocess
+import threading
+import time
+
+PROC_NET_ARP = '/proc/net/arp'
+MAC_NOT_FOUND = "MAC Address Not Found"
+
+ATF_COM = 0x2  # entry is complete
+ARP_LINE_RE = re.compile(r'\(([^)]+)\) at ([0-9A-Fa-f]{1,2}(?::[0-9A-Fa-f]{1,2}){5})\b')
+
+
+def read_proc_net_arp(path=PROC_NET_ARP):
+    """ Parses /proc/net/arp into a dict of IP -> upper-case MAC for complete entries """
+    table = {}
+    with open(path) as f:
+        next(f, None)  # header
+        for line in f:
+            fields = line.split()
+            if len(fields) < 6:
+                continue
+            ip_address, flags, mac_address = fields[0], fields[2], fields[3]
+            try:
+                if not int(flags, 16) & ATF_COM:
+                    continue
+            except ValueError:
+                continue
+            if mac_address == '00:00:00:00:00:00':
+                continue
+            table[ip_address] = mac_address.upper()
+    return table
+
+
+def read_arp_command():
+    """ Parses the output of `arp -an` into a dict of IP -> upper-case MAC """
+    result = subprocess.run(['arp', '-an'], capture_output=True, text=True, timeout=5)
+    table = {}
+    for line in result.stdout.splitlines():
+        match = ARP_LINE_RE.search(line)
+        if match:
+            # BSD arp prints octets without leading zeros (a:b:c:d:e:f)
+            octets = match.group(2).split(':')
+            table[match.group(1)] = ':'.join(o.zfill(2) for o in octets).upper()
+    return table
+
+
+def normalize(ip_address):
+    if ip_address.startswith('::ffff:'):
+        return ip_address[7:]  # IPv4-mapped address from a dual-stack socket
+    return ip_address
+
+
+class NeighborTable:
+    """ Thread-safe IP -> MAC cache filled from bulk reads of the neighbour table.
+
+    `ttl` is how long a bulk read is trusted, `negative_ttl` how long an address
+    that was not found is remembered, and `min_refresh` the minimum time between
+    two bulk reads, which bounds the work done when many unknown addresses
+    (e.g. a scan) arrive at once.
+    """
+
+    def __init__(self, ttl=30.0, negative_ttl=5.0, min_refresh=0.5, path=PROC_NET_ARP):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.min_refresh = min_refresh
+        self.path = path
+        self._entries = {}
+        self._misses = {}
+        self._refreshed = None
+        self._lock = threading.Lock()
+
+    def _read(self):
+        if os.path.exists(self.path):
+            return read_proc_net_arp(self.path)
+        return read_arp_command()
+
+    def refresh(self):
+        """ Re-reads the whole neighbour table """
+        with self._lock:
+            self._refresh(time.monotonic())
+
+    def _refresh(self, now):
+        try:
+            self._entries = self._read()
+        except Exception as e:
+            print(f"Error reading neighbour table: {e}")
+        self._refreshed = now
+        self._misses = {ip: until for ip, until in self._misses.items() if until > now}
+
+    def _cached(self, ip_address, now):
+        """ (True, MAC or None) if the cache can answer for `ip_address`, (False, None) if the table must be read """
+        age = None if self._refreshed is None else now - self._refreshed
+        if age is not None and age < self.ttl:
+            mac_address = self._entries.get(ip_address)
+            if mac_address is not None:
+                return True, mac_address
+            if self._misses.get(ip_address, 0) > now or age < self.min_refresh:
+                return True, None
+        return False, None
+
+    def peek(self, ip_address):
+        """ Like lookup(), but never reads the table or waits for a read in progress.
+        Returns (True, MAC or None) when the cache can answer, (False, None) when lookup() has to read the table;
+        event loops call lookup() in an executor in that case, since `arp -an` may take seconds. """
+        ip_address = normalize(ip_address)
+        if not self._lock.acquire(blocking=False):
+            return False, None
+        try:
+            return self._cached(ip_address, time.monotonic())
+        finally:
+            self._lock.release()
+
+    def lookup(self, ip_address):
+        """ Returns the MAC address for `ip_address`, or None if it is not known """
+        ip_address = normalize(ip_address)
+        now = time.monotonic()
+        with self._lock:
+            known, mac_address = self._cached(ip_address, now)
+            if known:
+                return mac_address
+
+            # Stale table or an address we have not seen yet: read the table again
+            self._refresh(now)
+            mac_address = self._entries.get(ip_address)
+            if mac_address is None:
+                self._misses[ip_address] = now + self.negative_ttl
+            return mac_address
+
+
+neighbor_table = NeighborTable()
+
+
+def get_mac_address(ip_address):
+    """ Retrieves the MAC address of the device using the given IP address """
+    return neighbor_table.lookup(ip_address) or MAC_NOT_FOUND
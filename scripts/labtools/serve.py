@@ -0,0 +1,481 @@
+# Shared launcher for the lab's Flask apps (md_report, show_ip_browser_info).
+#
+# Replaces app.run(debug=True), i.e. Werkzeug's development server with the
+# debugger and reloader, by:
+# - a poller thread in front of the request threads: it waits on every open
+#   connection with a selector and reads the request head, so slow clients and idle
+#   keep-alive connections cost a file descriptor instead of a thread. A connection
+#   must send a complete request head within `header_timeout` seconds; an idle
+#   keep-alive connection is closed cleanly after `timeout` seconds
+# - HTTP keep-alive for requests without a body whose response has a known length
+#   (Werkzeug itself closes every connection after one response, because it cannot
+#   skip a request body the app did not read before parsing the next request)
+# - a fixed pool of request threads per process for complete requests; a request
+#   for a server-sent event stream (Accept: text/event-stream) gets its own thread
+#   instead, up to `max_streams`, so open pages never starve the pool (or /healthz)
+# - at most `max_connections` open connections per process: above that the server
+#   stops accepting and new connections wait in the kernel backlog
+# - optionally N worker processes forked from a supervisor, all accepting on one
+#   listening socket bound before the fork; a worker that dies is restarted
+# - an app factory called in every worker after the fork, so each process builds
+#   its own state (threads, database connections) instead of sharing module globals
+# - templates loaded and compiled before the worker starts accepting
+# - /healthz, answered before the request reaches the app (503 while draining)
+# - graceful shutdown on SIGTERM/SIGINT: stop accepting, close idle connections, let
+#   in-flight requests finish for up to `grace` seconds, then exit (running atexit
+#   handlers); open event streams are dropped and their clients reconnect
+# - no per-request access log unless asked for
+
+import collections
+import io
+import json
+import os
+import queue
+import selectors
+import signal
+import socket
+import sys
+import threading
+import time
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+
+MAX_HEAD_BYTES = 65536  # a request head larger than this is passed on as is (and rejected by the handler)
+STREAM_BUSY = (b'HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n'
+               b'Retry-After: 10\r\nConnection: close\r\n\r\n')
+
+
+class _PrefixedReader(io.RawIOBase):
+    """ Reads the bytes the poller already received from a connection, then the socket """
+
+    def __init__(self, prefix, sock):
+        self._prefix = prefix
+        self._socket = socket.SocketIO(sock, 'rb')
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self._prefix:
+            return self._socket.readinto(buffer)
+        size = min(len(buffer), len(self._prefix))
+        buffer[:size] = self._prefix[:size]
+        self._prefix = self._prefix[size:]
+        return size
+
+    def close(self):
+        self._socket.close()
+        super().close()
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    timeout = 15  # seconds a request body may take to arrive and a response to be sent; set by serve()
+    access_log = False
+
+    def setup(self):
+        super().setup()
+        self.rfile.close()
+        self.rfile = io.BufferedReader(_PrefixedReader(self.server.take_prefix(self.connection), self.connection))
+        self.keep_open = False
+
+    def send_response(self, code, message=None):
+        self._length_known = code in (204, 304)
+        super().send_response(code, message)
+
+    def send_header(self, keyword, value):
+        name = keyword.lower()
+        if name == 'content-length':
+            self._length_known = True
+        elif name == 'connection' and value.lower() == 'close' and self._reusable():
+            # Werkzeug sends this on every response; keep the connection if the client asked for it
+            value = 'keep-alive'
+        super().send_header(keyword, value)
+
+    def _reusable(self):
+        """ Whether the connection can carry another request after this response: the client
+        wants keep-alive, the response has a known length and the request had no body """
+        return (not self.close_connection and getattr(self, '_length_known', False)
+                and self.headers.get('Content-Length', '0').strip() == '0'
+                and 'Transfer-Encoding' not in self.headers)
+
+    def handle(self):
+        """ Serves the requests that already arrived; an idle keep-alive connection goes back to the poller """
+        try:
+            self.close_connection = True
+            self.handle_one_request()
+            while not self.close_connection:
+                if not self._pending():
+                    self.keep_open = True
+                    return
+                self.handle_one_request()
+        except (ConnectionError, socket.timeout) as e:
+            self.connection_dropped(e)
+
+    def _pending(self):
+        """ Whether the next request (or part of it) has been received, without waiting for it """
+        self.connection.settimeout(0)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def log_request(self, code='-', size='-'):
+        if self.access_log:
+            super().log_request(code, size)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """ Werkzeug WSGI server that reads request heads in a poller thread and hands complete
+    requests to a fixed pool of threads (event streams to a thread of their own) """
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads=16, handler=None, fd=None, header_timeout=5, idle_timeout=15,
+                 max_streams=256, max_connections=1000):
+        super().__init__(host, port, app, handler=handler, fd=fd)
+        self.threads = threads
+        self.header_timeout = header_timeout
+        self.idle_timeout = idle_timeout
+        self.max_streams = max_streams
+        self.active = 0
+        self.streams = 0
+        self.draining = False
+        self._stopping = False
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._connections = threading.BoundedSemaphore(max_connections)
+        self._prefixes = {}  # socket -> bytes the poller read from it
+        self._incoming = collections.deque()  # connections for the poller to watch
+        self._waiting = {}  # socket -> [client address, bytes received, deadline]
+        self._selector = selectors.DefaultSelector()
+        self._wakeup, self._wakeup_write = socket.socketpair()
+        self._wakeup.setblocking(False)
+        self._wakeup_write.setblocking(False)
+        self._selector.register(self._wakeup, selectors.EVENT_READ)
+        self._poller = threading.Thread(target=self._poll, name='poller', daemon=True)
+        self._poller.start()
+        self._workers = [threading.Thread(target=self._work, name=f'request-{n}', daemon=True)
+                         for n in range(threads)]
+        for thread in self._workers:
+            thread.start()
+
+    def process_request(self, request, client_address):
+        # Blocks the accept loop while max_connections connections are open, but not shutdown()
+        while not self._connections.acquire(timeout=0.5):
+            if self._stopping:
+                request.close()
+                return
+        self._watch(request, client_address, idle=False)
+
+    def shutdown(self):
+        self._stopping = True
+        super().shutdown()
+
+    def shutdown_request(self, request):
+        self._prefixes.pop(request, None)
+        super().shutdown_request(request)
+        self._connections.release()
+
+    def take_prefix(self, request):
+        return self._prefixes.pop(request, b'')
+
+    def waiting(self):
+        return len(self._waiting) + len(self._incoming)
+
+    def _watch(self, request, client_address, idle):
+        """ Hands a connection to the poller until its next request head has arrived; `idle` is
+        True for a keep-alive connection between requests, False for a new one """
+        if self.draining:
+            self.shutdown_request(request)
+            return
+        self._incoming.append((request, client_address, idle))
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wakeup_write.send(b'\0')
+        except OSError:
+            pass  # the poller is already awake (the buffer is full) or stopped
+
+    def stop_polling(self):
+        """ Stops taking further requests: closes the connections waiting for one and ends the poller """
+        self.draining = True
+        self._wake()
+        self._poller.join(5)
+
+    def _poll(self):
+        next_sweep = 0
+        while not self.draining:
+            for key, _ in self._selector.select(0.5):
+                if key.fileobj is self._wakeup:
+                    try:
+                        while self._wakeup.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                else:
+                    self._receive(key.fileobj)
+            while self._incoming:
+                request, client_address, idle = self._incoming.popleft()
+                request.setblocking(False)
+                deadline = time.monotonic() + (self.idle_timeout if idle else self.header_timeout)
+                self._waiting[request] = [client_address, b'', deadline]
+                self._selector.register(request, selectors.EVENT_READ)
+            now = time.monotonic()
+            if now >= next_sweep:
+                next_sweep = now + 0.5
+                for request, (_, _, deadline) in list(self._waiting.items()):
+                    if deadline <= now:
+                        self._release(request)
+        for request in list(self._waiting):
+            self._release(request)
+        while self._incoming:
+            self.shutdown_request(self._incoming.popleft()[0])
+
+    def _release(self, request):
+        """ Stops watching a connection and closes it """
+        self._selector.unregister(request)
+        del self._waiting[request]
+        self.shutdown_request(request)
+
+    def _receive(self, request):
+        state = self._waiting[request]
+        try:
+            data = request.recv(MAX_HEAD_BYTES)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._release(request)
+            return
+        if not state[1]:
+            # The next request has started: it must be complete within header_timeout
+            state[2] = time.monotonic() + self.header_timeout
+        state[1] += data
+        received = state[1]
+        end = received.find(b'\r\n\r\n')
+        if end < 0:
+            end = received.find(b'\n\n')
+        if end < 0 and len(received) < MAX_HEAD_BYTES:
+            return
+        self._selector.unregister(request)
+        del self._waiting[request]
+        request.setblocking(True)
+        self._prefixes[request] = received
+        head = received[:end] if end >= 0 else received
+        if b'text/event-stream' in head.lower():
+            self._start_stream(request, state[0])
+        else:
+            self._queue.put((request, state[0]))
+
+    def _start_stream(self, request, client_address):
+        with self._lock:
+            busy = self.streams >= self.max_streams
+            if not busy:
+                self.streams += 1
+        if busy:
+            try:
+                request.settimeout(1)
+                request.sendall(STREAM_BUSY)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        threading.Thread(target=self._stream, args=(request, client_address), daemon=True).start()
+
+    def _stream(self, request, client_address):
+        try:
+            self._handle(request, client_address)
+        finally:
+            with self._lock:
+                self.streams -= 1
+
+    def _work(self):
+        while True:
+            request, client_address = self._queue.get()
+            with self._lock:
+                self.active += 1
+            try:
+                self._handle(request, client_address)
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+    def _handle(self, request, client_address):
+        """ Serves the requests received on a connection, then returns it to the poller or closes it """
+        keep_open = False
+        try:
+            keep_open = self.RequestHandlerClass(request, client_address, self).keep_open
+        except Exception:
+            self.handle_error(request, client_address)
+        if keep_open:
+            self._watch(request, client_address, idle=True)
+        else:
+            self.shutdown_request(request)
+
+    def idle(self):
+        return self._queue.empty() and self.active == 0
+
+
+class HealthCheck:
+    """ WSGI middleware answering /healthz with the worker's state """
+
+    def __init__(self, app, server_state):
+        self.app = app
+        self.state = server_state
+        self.started = time.time()
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO') != '/healthz':
+            return self.app(environ, start_response)
+        server = self.state.get('server')
+        draining = self.state.get('draining', False)
+        body = json.dumps({
+            'status': 'draining' if draining else 'ok',
+            'pid': os.getpid(),
+            'uptime': round(time.time() - self.started, 1),
+            'busy_threads': server.active if server else 0,
+            'threads': server.threads if server else 0,
+            'streams': server.streams if server else 0,
+            'waiting_connections': server.waiting() if server else 0,
+        }).encode('utf-8')
+        start_response('503 Service Unavailable' if draining else '200 OK',
+                       [('Content-Type', 'application/json'), ('Content-Length', str(len(body))),
+                        ('Cache-Control', 'no-store')])
+        return [body]
+
+
+def warm(app):
+    """ Loads and compiles every template the app can find, so the first requests do not pay for it """
+    for name in app.jinja_env.list_templates():
+        try:
+            app.jinja_env.get_template(name)
+        except Exception as e:
+            print(f"Could not compile template {name}: {e}")
+
+
+def _serve_worker(create_app, listen_socket, threads, timeout, access_log, grace, limits):
+    """ Builds the app in this process and serves it until SIGTERM/SIGINT """
+    app = create_app()
+    warm(app)
+
+    state = {'draining': False}
+    handler = type('RequestHandler', (QuietRequestHandler,), {'timeout': timeout, 'access_log': access_log})
+    host, port = listen_socket.getsockname()[:2]
+    server = PooledWSGIServer(host, port, HealthCheck(app, state), threads=threads, handler=handler,
+                              fd=listen_socket.fileno(), idle_timeout=timeout, **limits)
+    state['server'] = server
+
+    def stop(signum, frame):
+        if not state['draining']:
+            state['draining'] = True
+            # shutdown() waits for serve_forever() to return, so it cannot run in this (the serving) thread
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    server.serve_forever()
+    server.stop_polling()
+    deadline = time.monotonic() + grace
+    while not server.idle() and time.monotonic() < deadline:
+        time.sleep(0.1)
+    if not server.idle():
+        print(f"Worker {os.getpid()}: {server.active} requests still running after {grace}s, exiting anyway")
+
+
+def serve(create_app, host='0.0.0.0', port=5000, workers=1, threads=16, backlog=128,
+          timeout=15, grace=10, access_log=False, header_timeout=5, max_streams=256, max_connections=1000):
+    """ Serves the app returned by `create_app()` with `workers` processes of `threads` threads each """
+    limits = {'header_timeout': header_timeout, 'max_streams': max_streams, 'max_connections': max_connections}
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    try:
+        listen_socket = socket.create_server((host, port), family=family, backlog=backlog)
+    except OSError as e:
+        print(f"Cannot listen on {host}:{port}: {e}")
+        sys.exit(1)
+    print(f"Serving on http://{host}:{port}/ with {workers} worker(s) x {threads} threads (health: /healthz)")
+
+    if workers <= 1:
+        _serve_worker(create_app, listen_socket, threads, timeout, access_log, grace, limits)
+        return
+
+    children = {}  # pid -> started at
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            # Until the worker installs its own handlers: Ctrl-C is handled by the supervisor
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            code = 0
+            try:
+                _serve_worker(create_app, listen_socket, threads, timeout, access_log, grace, limits)
+            except Exception as e:
+                print(f"Worker {os.getpid()} failed: {e}")
+                code = 1
+            sys.exit(code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+
+    failures = 0
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+        print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+        # Back off if workers keep dying right after start (e.g. a broken app factory)
+        failures = failures + 1 if time.monotonic() - started < 5 else 0
+        time.sleep(min(0.5 * failures, 10))
+        if not stopping:
+            spawn()
+    listen_socket.close()
+
+
+def add_arguments(parser, port):
+    """ Adds the launcher's options to an app's argparse parser """
+    parser.add_argument('--host', default='0.0.0.0', help='Address to listen on (default: 0.0.0.0)')
+    parser.add_argument('--port', type=int, default=port, help=f'Port to listen on (default: {port})')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes (default: 1)')
+    parser.add_argument('--threads', type=int, default=16, help='Request threads per worker (default: 16)')
+    parser.add_argument('--timeout', type=float, default=15,
+                        help='Seconds an idle connection is kept open (default: 15)')
+    parser.add_argument('--header-timeout', type=float, default=5,
+                        help='Seconds a client has to send the headers of a request (default: 5)')
+    parser.add_argument('--max-streams', type=int, default=256,
+                        help='Event streams served at once per worker, each in its own thread (default: 256)')
+    parser.add_argument('--max-connections', type=int, default=1000,
+                        help='Open connections per worker, busy or idle (default: 1000)')
+    parser.add_argument('--grace', type=float, default=10,
+                        help='Seconds in-flight requests get to finish on shutdown (default: 10)')
+    parser.add_argument('--access-log', action='store_true', help='Log every request')
+
+
+def serve_from_args(create_app, args):
+    serve(create_app, host=args.host, port=args.port, workers=args.workers, threads=args.threads,
+          timeout=args.timeout, grace=args.grace, access_log=args.access_log, header_timeout=args.header_timeout,
+          max_streams=args.max_streams, max_connections=args.max_connections)
@@ -0,0 +1,443 @@
+# Incremental log analytics for the honeypot auth log and the show_ip_browser_info visitor log.
+#
+# Log files are read through mmap, line by line, starting from a checkpointed
+# byte offset, so every run only processes what was appended since the last
+# one. Parsed lines are folded into on-disk aggregates in an SQLite database:
+# hit counts with first/last seen per IP, MAC, User-Agent and path (plus the
+# username, realm and URI of captured Digest/Basic Authorization headers), and
+# the same counts per hour for time-window queries. The aggregates and the new
+# checkpoint are committed in the same transaction, so an interrupted run never
+# counts a line twice. Top-N and time-window queries only touch the aggregate
+# tables and answer in milliseconds no matter how long the logs are.
+#
+# Supported inputs:
+# - honeypot auth log: JSON Lines written by tricks/honeypot_CSS326-24G-2S+.py, and the older
+#   "asctime - time, mac, ip, user agent, uri, Authorization: ..." text lines
+# - visitor log: logs.csv written by scripts/show_ip_browser_info/app_mac_csv.py
+#
+# A file that was truncated or replaced (rotation) is detected by its inode and
+# first bytes. The file it was rotated away from is then looked up among the
+# rotated segments next to it (path.YYYYmmdd-HHMMSS[.N][.gz|.zst], as written by
+# honeypot/authlog.py) by inode, or by first bytes for compressed segments, and
+# read from the checkpointed offset to its end, followed by any segments rotated
+# after it, before the new file is read from the start. If the previous file
+# cannot be found, a warning says from which offset its lines were skipped.
+#
+# Usage:
+# - python3 log_analytics.py ingest --honeypot /var/log/honeypot_CSS326-24G-2S+.log --visitors logs.csv
+# - python3 log_analytics.py top ip -n 20
+# - python3 log_analytics.py top username --source honeypot --since 2026-10-01 --until 2026-10-08
+# - python3 log_analytics.py timeline --dimension ip --value 192.168.100.23
+
+import argparse
+import base64
+import csv
+import glob
+import gzip
+import json
+import mmap
+import os
+import re
+import sqlite3
+import sys
+import time
+from collections import Counter
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DIMENSIONS = ('ip', 'mac', 'user_agent', 'path', 'username', 'realm', 'digest_uri')
+COMMIT_EVERY = 50000  # lines per transaction
+HEAD_BYTES = 64  # bytes compared to detect a replaced file
+
+AUTH_PARAM_RE = re.compile(r'(\w+)=(?:"([^"]*)"|([^,\s]*))')
+SEGMENT_RE = re.compile(r'^(\d{8}-\d{6})(?:\.(\d+))?(\.gz|\.zst)?$')
+LEGACY_LINE_RE = re.compile(r'^\S+ \S+ - (\d{4}-\d\d-\d\d \d\d:\d\d:\d\d), ([^,]*), ([^,]*), (.*)$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    source TEXT NOT NULL,
+    path TEXT NOT NULL,
+    inode INTEGER,
+    offset INTEGER NOT NULL,
+    head BLOB,
+    columns TEXT,
+    PRIMARY KEY (source, path)
+);
+CREATE TABLE IF NOT EXISTS aggregates (
+    source TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    hits INTEGER NOT NULL,
+    first_seen TEXT,
+    last_seen TEXT,
+    PRIMARY KEY (source, dimension, value)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS aggregates_top ON aggregates (source, dimension, hits DESC);
+CREATE TABLE IF NOT EXISTS hourly (
+    source TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    hour TEXT NOT NULL,
+    value TEXT NOT NULL,
+    hits INTEGER NOT NULL,
+    PRIMARY KEY (source, dimension, hour, value)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS hourly_value ON hourly (source, dimension, value, hour);
+"""
+
+
+def parse_authorization(header):
+    """ Extracts username, realm and uri from a Digest or Basic Authorization header value """
+    if not header:
+        return {}
+    if header.lower().startswith('authorization:'):
+        header = header.split(':', 1)[1].strip()  # older logs kept the header name
+    scheme, _, params = header.partition(' ')
+    if scheme.lower() == 'digest':
+        fields = {name.lower(): quoted if quoted else plain
+                  for name, quoted, plain in AUTH_PARAM_RE.findall(params)}
+        return {'username': fields.get('username'), 'realm': fields.get('realm'), 'digest_uri': fields.get('uri')}
+    if scheme.lower() == 'basic':
+        try:
+            username = base64.b64decode(params.strip(), validate=True).decode('utf-8', 'replace').split(':', 1)[0]
+            return {'username': username}
+        except ValueError:
+            return {}
+    return {}
+
+
+def parse_honeypot_line(line):
+    """ Returns (time, {dimension: value}) for a honeypot log line, or None """
+    if line.startswith('{'):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        values = {
+            'ip': record.get('ip'),
+            'mac': record.get('mac'),
+            'user_agent': record.get('user_agent'),
+            'path': record.get('uri'),
+        }
+        values.update(parse_authorization(record.get('authorization')))
+        return record.get('time', '').replace('T', ' '), values
+
+    # Older text format: the User-Agent may contain ", " so the URI is taken from the right
+    match = LEGACY_LINE_RE.match(line)
+    if not match:
+        return None
+    timestamp, mac, ip, rest = match.groups()
+    position = rest.find(', Authorization:')
+    if position == -1:
+        position = rest.rfind(', No Authorization Header')
+    if position == -1:
+        return None
+    user_agent, _, path = rest[:position].rpartition(', ')
+    values = {'ip': ip, 'mac': mac, 'user_agent': user_agent, 'path': path}
+    values.update(parse_authorization(rest[position + 2:]))
+    return timestamp, values
+
+
+def parse_visitor_line(line, columns):
+    """ Returns (time, {dimension: value}) for a logs.csv row, or None """
+    try:
+        row = next(csv.reader([line]))
+    except (csv.Error, StopIteration):
+        return None
+    fields = dict(zip(columns, row))
+    values = {
+        'ip': fields.get('IP'),
+        'mac': fields.get('MAC'),
+        'user_agent': fields.get('User Agent'),
+        'path': fields.get('Path'),
+    }
+    return fields.get('Time', '').replace('T', ' '), values
+
+
+def iter_lines(mm, offset):
+    """ Yields (line, end offset) for every complete line in the mapping from `offset` """
+    size = len(mm)
+    while offset < size:
+        end = mm.find(b'\n', offset)
+        if end == -1:
+            return  # incomplete last line: leave it for the next run
+        yield mm[offset:end].decode('utf-8', 'backslashreplace').rstrip('\r'), end + 1
+        offset = end + 1
+
+
+def iter_file_lines(f, offset):
+    """ Yields (line, end offset) for every line of a rotated segment from the current position (`offset`) """
+    for raw in f:
+        offset += len(raw)
+        yield raw.rstrip(b'\n').decode('utf-8', 'backslashreplace').rstrip('\r'), offset
+
+
+def rotated_segments(path):
+    """ Rotated segments of `path` (path.YYYYmmdd-HHMMSS[.N][.gz|.zst]), oldest first """
+    segments = []
+    for candidate in glob.glob(glob.escape(path) + '.*'):
+        match = SEGMENT_RE.match(candidate[len(path) + 1:])
+        if match:
+            segments.append((match.group(1), int(match.group(2) or 0), candidate))
+    return [candidate for _, _, candidate in sorted(segments)]
+
+
+def open_segment(segment):
+    """ Opens a rotated segment for reading, decompressing it if needed; None if it cannot be read """
+    if segment.endswith('.gz'):
+        return gzip.open(segment, 'rb')
+    if segment.endswith('.zst'):
+        if zstandard is None:
+            print(f"Skipping {segment}: reading zstd segments needs the 'zstandard' package")
+            return None
+        return zstandard.open(segment, 'rb')
+    return open(segment, 'rb')
+
+
+def is_checkpointed_segment(segment, inode, offset, head):
+    """ Whether `segment` is the file a checkpoint was taken of: same inode and first bytes, or for a
+    compressed segment (a new file) the same first bytes """
+    try:
+        if segment.endswith(('.gz', '.zst')):
+            f = open_segment(segment)
+            if f is None or not head:
+                return False
+            with f:
+                return f.read(len(head)) == head
+        stat = os.stat(segment)
+        with open(segment, 'rb') as f:
+            return stat.st_ino == inode and offset <= stat.st_size and f.read(len(head)) == head
+    except OSError as e:
+        print(f"Skipping {segment}: {e}")
+        return False
+
+
+class Analytics:
+    def __init__(self, db_path):
+        self.db = sqlite3.connect(db_path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(SCHEMA)
+
+    def ingest(self, source, path):
+        """ Reads the lines appended to `path` since the last run; returns the number of lines processed """
+        try:
+            f = open(path, 'rb')
+        except OSError as e:
+            print(f"Skipping {path}: {e}")
+            return 0
+
+        row = self.db.execute('SELECT inode, offset, head, columns FROM checkpoints WHERE source = ? AND path = ?',
+                              (source, path)).fetchone()
+        with f:
+            stat = os.fstat(f.fileno())
+            head = f.read(HEAD_BYTES)
+            offset, columns, processed = 0, None, 0
+            if row is not None:
+                inode, saved_offset, saved_head, saved_columns = row
+                saved_head = bytes(saved_head or b'')
+                saved_columns = json.loads(saved_columns) if saved_columns else None
+                # Same file as last time: it still has our inode, the same first bytes and did not shrink
+                if inode == stat.st_ino and saved_offset <= stat.st_size and head[:len(saved_head)] == saved_head:
+                    offset, columns = saved_offset, saved_columns
+                else:
+                    processed = self._ingest_rotated(source, path, inode, saved_offset, saved_head, saved_columns)
+            if stat.st_size == 0:
+                # Keep the old checkpoint: an empty file cannot be recognised by its first bytes yet
+                return processed
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return processed + self._ingest_lines(source, path, stat.st_ino, head, iter_lines(mm, offset),
+                                                      offset, columns)
+
+    def _ingest_rotated(self, source, path, inode, offset, head, columns):
+        """ Finishes the file `path` was rotated away from (the checkpointed one) and reads the segments
+        rotated after it; returns the number of lines processed """
+        segments = rotated_segments(path)
+        for index, segment in enumerate(segments):
+            if is_checkpointed_segment(segment, inode, offset, head):
+                break
+        else:
+            print(f"Warning: {path} was rotated or truncated and its previous file was not found; "
+                  f"lines written to it after byte {offset} since the last run were skipped")
+            return 0
+
+        processed = 0
+        for segment in segments[index:]:
+            f = open_segment(segment)
+            if f is None:
+                print(f"Warning: lines in {segment} after byte {offset} were skipped")
+            else:
+                with f:
+                    segment_head = f.read(HEAD_BYTES)
+                    f.seek(offset)
+                    # Checkpointed under the segment's identity, so an interrupted run resumes inside it
+                    processed += self._ingest_lines(source, path, os.stat(segment).st_ino, segment_head,
+                                                    iter_file_lines(f, offset), offset, columns)
+            offset, columns = 0, None
+        return processed
+
+    def _ingest_lines(self, source, path, inode, head, lines, offset, columns):
+        totals, hourly, first_seen, last_seen = Counter(), Counter(), {}, {}
+        processed = pending = 0
+
+        for line, end in lines:
+            offset = end
+            if not line:
+                continue
+            if source == 'visitors':
+                if columns is None or line.startswith('MAC,IP,'):
+                    columns = next(csv.reader([line]))
+                    continue
+                parsed = parse_visitor_line(line, columns)
+            else:
+                parsed = parse_honeypot_line(line)
+            if parsed is None:
+                continue
+
+            timestamp, values = parsed
+            hour = timestamp[:13] if len(timestamp) >= 13 else None
+            for dimension, value in values.items():
+                if not value:
+                    continue
+                key = (dimension, value)
+                totals[key] += 1
+                if timestamp:
+                    if key not in first_seen or timestamp < first_seen[key]:
+                        first_seen[key] = timestamp
+                    if key not in last_seen or timestamp > last_seen[key]:
+                        last_seen[key] = timestamp
+                if hour:
+                    hourly[(dimension, hour, value)] += 1
+            processed += 1
+            pending += 1
+
+            if pending >= COMMIT_EVERY:
+                self._commit(source, path, inode, head, offset, columns, totals, hourly, first_seen, last_seen)
+                totals, hourly, first_seen, last_seen = Counter(), Counter(), {}, {}
+                pending = 0
+
+        self._commit(source, path, inode, head, offset, columns, totals, hourly, first_seen, last_seen)
+        return processed
+
+    def _commit(self, source, path, inode, head, offset, columns, totals, hourly, first_seen, last_seen):
+        with self.db:
+            self.db.executemany(
+                """INSERT INTO aggregates (source, dimension, value, hits, first_seen, last_seen)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (source, dimension, value) DO UPDATE SET
+                       hits = hits + excluded.hits,
+                       first_seen = CASE WHEN first_seen IS NULL OR excluded.first_seen < first_seen
+                                         THEN excluded.first_seen ELSE first_seen END,
+                       last_seen = CASE WHEN last_seen IS NULL OR excluded.last_seen > last_seen
+                                        THEN excluded.last_seen ELSE last_seen END""",
+                ((source, dimension, value, hits, first_seen.get((dimension, value)), last_seen.get((dimension, value)))
+                 for (dimension, value), hits in totals.items()))
+            self.db.executemany(
+                """INSERT INTO hourly (source, dimension, hour, value, hits) VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT (source, dimension, hour, value) DO UPDATE SET hits = hits + excluded.hits""",
+                ((source, dimension, hour, value, hits) for (dimension, hour, value), hits in hourly.items()))
+            self.db.execute(
+                """INSERT INTO checkpoints (source, path, inode, offset, head, columns) VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (source, path) DO UPDATE SET
+                       inode = excluded.inode, offset = excluded.offset, head = excluded.head,
+                       columns = excluded.columns""",
+                (source, path, inode, offset, head, json.dumps(columns) if columns else None))
+
+    def top(self, dimension, limit=10, source=None, since=None, until=None):
+        """ Most frequent values of a dimension, overall or within [since, until) at hour granularity """
+        sources = [source] if source else ['honeypot', 'visitors']
+        marks = ','.join('?' * len(sources))
+        if since or until:
+            return self.db.execute(
+                f"""SELECT value, SUM(hits) AS total, MIN(hour), MAX(hour) FROM hourly
+                    WHERE source IN ({marks}) AND dimension = ? AND hour >= ? AND hour < ?
+                    GROUP BY value ORDER BY total DESC LIMIT ?""",
+                (*sources, dimension, hour_key(since, '0000'), hour_key(until, '9999'), limit)).fetchall()
+        if source:
+            return self.db.execute(
+                """SELECT value, hits, first_seen, last_seen FROM aggregates
+                   WHERE source = ? AND dimension = ? ORDER BY hits DESC LIMIT ?""",
+                (source, dimension, limit)).fetchall()
+        return self.db.execute(
+            f"""SELECT value, SUM(hits) AS total, MIN(first_seen), MAX(last_seen) FROM aggregates
+                WHERE source IN ({marks}) AND dimension = ? GROUP BY value ORDER BY total DESC LIMIT ?""",
+            (*sources, dimension, limit)).fetchall()
+
+    def timeline(self, dimension=None, value=None, source=None, since=None, until=None):
+        """ Hits per hour, for everything or for one value of a dimension """
+        sources = [source] if source else ['honeypot', 'visitors']
+        marks = ','.join('?' * len(sources))
+        # Every hit counts once per dimension, so count the IP dimension when no value is given
+        dimension = dimension or 'ip'
+        query = f"""SELECT hour, SUM(hits) FROM hourly
+                    WHERE source IN ({marks}) AND dimension = ? AND hour >= ? AND hour < ?"""
+        params = [*sources, dimension, hour_key(since, '0000'), hour_key(until, '9999')]
+        if value is not None:
+            query += " AND value = ?"
+            params.append(value)
+        return self.db.execute(query + " GROUP BY hour ORDER BY hour", params).fetchall()
+
+
+def hour_key(moment, default):
+    """ 'YYYY-MM-DD[ HH[:MM...]]' -> 'YYYY-MM-DD HH', as stored in the hourly table """
+    if not moment:
+        return default
+    moment = moment.replace('T', ' ')
+    return moment[:13] if len(moment) >= 13 else moment[:10] + ' 00'
+
+
+def print_rows(rows, headers, as_json):
+    if as_json:
+        print(json.dumps([dict(zip(headers, row)) for row in rows], ensure_ascii=False, indent=2))
+        return
+    print('\t'.join(headers))
+    for row in rows:
+        print('\t'.join('' if cell is None else str(cell) for cell in row))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Incremental analytics for honeypot and visitor logs')
+    parser.add_argument('--db', default=os.path.join(os.getcwd(), 'log_analytics.db'),
+                        help='SQLite database with checkpoints and aggregates (default: ./log_analytics.db)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest = commands.add_parser('ingest', help='Process lines appended since the last run')
+    ingest.add_argument('--honeypot', action='append', default=[], help='Honeypot auth log, may be repeated')
+    ingest.add_argument('--visitors', action='append', default=[], help='Visitor logs.csv, may be repeated')
+
+    for name, help_text in (('top', 'Most frequent values of a dimension'), ('timeline', 'Hits per hour')):
+        command = commands.add_parser(name, help=help_text)
+        if name == 'top':
+            command.add_argument('dimension', choices=DIMENSIONS)
+            command.add_argument('-n', '--limit', type=int, default=10, help='Number of rows (default: 10)')
+        else:
+            command.add_argument('--dimension', choices=DIMENSIONS, help='Only hits with this dimension ...')
+            command.add_argument('--value', help='... having this value')
+        command.add_argument('--source', choices=['honeypot', 'visitors'], help='Only one log source')
+        command.add_argument('--since', help='Start of the time window, e.g. 2026-10-01 or 2026-10-01T08')
+        command.add_argument('--until', help='End of the time window (exclusive, hour granularity)')
+        command.add_argument('--json', action='store_true', help='Print JSON instead of a table')
+
+    args = parser.parse_args()
+    analytics = Analytics(args.db)
+    started = time.perf_counter()
+
+    if args.command == 'ingest':
+        if not args.honeypot and not args.visitors:
+            parser.error('Nothing to ingest, pass --honeypot and/or --visitors')
+        for source, paths in (('honeypot', args.honeypot), ('visitors', args.visitors)):
+            for path in paths:
+                lines = analytics.ingest(source, os.path.abspath(path))
+                print(f"{path}: {lines} new lines")
+    elif args.command == 'top':
+        rows = analytics.top(args.dimension, args.limit, args.source, args.since, args.until)
+        print_rows(rows, [args.dimension, 'hits', 'first', 'last'], args.json)
+    else:
+        if args.value is not None and args.dimension is None:
+            parser.error('--value needs --dimension')
+        rows = analytics.timeline(args.dimension, args.value, args.source, args.since, args.until)
+        print_rows(rows, ['hour', 'hits'], args.json)
+
+    print(f"({(time.perf_counter() - started) * 1000:.1f} ms)", file=sys.stderr)
@@ -1,18 +1,41 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
-import markdown2
+from flask import Flask, Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify, abort, Response
+import argparse
+import hmac
 import os
 import re
-import subprocess
+import sys
 from datetime import datetime
 
-app = Flask(__name__)
-app.secret_key = 'supersecretkey'  # Required for flash messages
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from labtools.neighbors import get_mac_address
+from labtools.serve import add_arguments, serve_from_args
+from render_cache import RenderCache, render_markdown
+from report_archive import ReportArchive
 
 # Path to save files
 SAVE_DIR = 'saved_data'
-
-if not os.path.exists(SAVE_DIR):
-    os.makedirs(SAVE_DIR)
+MAX_PREVIEW_CHARS = 1024 * 1024
+
+bp = Blueprint('md_report', __name__)
+
+def create_app(save_dir=SAVE_DIR, admin_token=None, cache_bytes=None, backfill=True):
+    """ Builds the app. Its state lives in app.extensions and app.config, so every worker process has its own:
+    - report_archive: saved reports and their index (saved_data/index.db)
+    - render_cache: rendered Markdown, whole documents for the form preview and blocks for /api/preview
+    - MD_REPORT_ADMIN_TOKEN: token for the report listing, search and export endpoints; they are disabled when it is not set
+    """
+    app = Flask(__name__)
+    app.secret_key = 'supersecretkey'  # Required for flash messages
+    app.config['MD_REPORT_ADMIN_TOKEN'] = admin_token if admin_token is not None else os.environ.get('MD_REPORT_ADMIN_TOKEN', '')
+
+    archive = ReportArchive(save_dir)
+    if backfill:
+        archive.backfill()
+    app.extensions['report_archive'] = archive
+    app.extensions['render_cache'] = RenderCache(
+        max_bytes=cache_bytes or int(os.environ.get('MD_REPORT_CACHE_BYTES', 64 * 1024 * 1024)))
+    app.register_blueprint(bp)
+    return app
 
 def validate_name(name):
     """ Validation of the name: only lowercase Latin characters up to 50 characters """
@@ -20,20 +43,7 @@ def validate_name(name):
         return True
     return False
 
-def get_mac_address(ip_address):
-    """ Retrieves the MAC address of the device using the given IP address """
-    try:
-        # Run the arp command to get the MAC address
-        result = subprocess.run(['arp', '-n', ip_address], capture_output=True, text=True)
-        # Parse the result of the command
-        for line in result.stdout.split('\n'):
-            if ip_address in line:
-                return line.split()[3].upper()
-    except Exception as e:
-        print(f"Error getting MAC address: {e}")
-    return "MAC Address Not Found"
-
-@app.route('/', methods=['GET', 'POST'])
+@bp.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
         name = request.form.get('name')
@@ -54,28 +64,95 @@ def index():
         metadata = f"**User Agent**: {user_agent}\n**IP**: {user_ip}\n**MAC Address**: {user_mac}\n**Time**: {current_time}\n\n"
         full_markdown_text = metadata + markdown_text
 
-        # Generate Markdown to HTML for preview
-        html_preview = markdown2.markdown(full_markdown_text, extras=["fenced-code-blocks"])
+        # Generate Markdown to HTML for preview; the text as a whole document, so it matches markdown2 exactly.
+        # The metadata changes every second, so it is rendered on its own and not cached
+        html_preview = render_markdown(metadata)
+        if markdown_text.strip():
+            html_preview += '\n' + current_app.extensions['render_cache'].render(markdown_text)
 
         # If 'SAVE' button is pressed
         if 'save' in request.form:
-            # Generate timestamp for the file suffix
-            file_suffix_time = datetime.now().strftime('%d%m%Y_%H%M%S')
-            file_name = f"{name}@gmail.com_{file_suffix_time}.md"
-            file_path = os.path.join(SAVE_DIR, file_name)
-
-            # Save the file
-            with open(file_path, 'w') as f:
-                f.write(full_markdown_text)
-            return redirect(url_for('saved', filename=file_name))
+            # Save the file (atomically, under a unique name) and index it
+            report = current_app.extensions['report_archive'].save(
+                name, full_markdown_text, ip=user_ip, mac=user_mac, user_agent=user_agent)
+            return redirect(url_for('.saved', filename=report['filename']))
 
         return render_template('index.html', name=name, markdown_text=markdown_text, html_preview=html_preview)
 
     return render_template('index.html', name='', markdown_text='', html_preview='')
 
-@app.route('/saved/<filename>')
+@bp.route('/api/preview', methods=['POST'])
+def api_preview():
+    """ Renders {"markdown_text": ..., "known": [hashes]} block by block for the live preview.
+    Blocks whose hash the client already has are returned without their HTML. """
+    data = request.get_json(silent=True) or {}
+    markdown_text = data.get('markdown_text', '')
+    known = data.get('known') or []
+    if (not isinstance(markdown_text, str) or not isinstance(known, list)
+            or not all(isinstance(key, str) for key in known)):
+        return jsonify(error='Expected {"markdown_text": string, "known": [hashes]}'), 400
+    if len(markdown_text) > MAX_PREVIEW_CHARS:
+        return jsonify(error='Text too long'), 413
+
+    known = set(known)
+    blocks = []
+    for key, html in current_app.extensions['render_cache'].render_blocks(markdown_text):
+        blocks.append({'hash': key} if key in known else {'hash': key, 'html': html})
+    return jsonify(blocks=blocks)
+
+def require_admin():
+    """ The report API needs the admin token as a Bearer token or a ?token= parameter (for browser downloads) """
+    admin_token = current_app.config['MD_REPORT_ADMIN_TOKEN']
+    if not admin_token:
+        abort(404)
+    header = request.headers.get('Authorization', '')
+    token = header[7:] if header.startswith('Bearer ') else request.args.get('token', '')
+    if not hmac.compare_digest(token.encode('utf-8'), admin_token.encode('utf-8')):
+        abort(401)
+
+def report_filters():
+    """ Filters shared by the listing and the export: ?name=&ip=&mac=&since=&until=&q= """
+    return {key: request.args.get(arg) or None
+            for key, arg in (('name', 'name'), ('ip', 'ip'), ('mac', 'mac'),
+                             ('since', 'since'), ('until', 'until'), ('query', 'q'))}
+
+@bp.route('/api/reports')
+def list_reports():
+    require_admin()
+    archive = current_app.extensions['report_archive']
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    return jsonify(reports=archive.find(limit=limit, offset=offset, **report_filters()))
+
+@bp.route('/api/reports/<report_id>')
+def get_report(report_id):
+    require_admin()
+    archive = current_app.extensions['report_archive']
+    report = archive.get(report_id)
+    if report is None or not os.path.isfile(archive.path(report)):
+        abort(404)
+    with open(archive.path(report), 'rb') as f:
+        return Response(f.read(), mimetype='text/markdown; charset=utf-8')
+
+@bp.route('/api/reports/export.zip')
+def export_reports():
+    require_admin()
+    archive = current_app.extensions['report_archive']
+    reports = archive.find(limit=None, **report_filters())
+    file_name = f"reports_{datetime.now().strftime('%d%m%Y_%H%M%S')}.zip"
+    return Response(archive.export_zip(reports), mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename="{file_name}"'})
+
+@bp.route('/saved/<filename>')
 def saved(filename):
     return f"File saved as {filename}"
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=80)
+    parser = argparse.ArgumentParser(description='Markdown report editor')
+    add_arguments(parser, 80)
+    parser.add_argument('--save-dir', default=SAVE_DIR, help=f'Directory for saved reports (default: {SAVE_DIR})')
+    args = parser.parse_args()
+
+    # Index reports saved by older versions once, before the workers start
+    ReportArchive(args.save_dir).backfill()
+    serve_from_args(lambda: create_app(args.save_dir, backfill=False), args)
@@ -0,0 +1,123 @@
+# Markdown rendering cache for md_report.
+#
+# Documents are split into top-level blocks (paragraphs, headings, lists, fenced
+# code blocks, ...) and every block is rendered on its own and cached under the
+# hash of its text in an LRU bounded by the total size of the cached HTML. While
+# a student edits a long report only the block being edited is rendered again;
+# the rest of the preview comes from the cache.
+#
+# Documents using reference-style links or footnotes (whose definitions affect
+# other blocks) are rendered as a whole, cached under the hash of the document.
+# Block output matches a whole-document render for the usual report layouts
+# (numbered steps with indented text and code, nested lists, fenced code), but
+# not in every corner case of markdown2, so it is only used for the live preview.
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+import markdown2
+
+EXTRAS = ["fenced-code-blocks"]
+ENTRY_OVERHEAD = 100  # rough per-entry bookkeeping, in bytes
+
+FENCE_RE = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+LIST_ITEM_RE = re.compile(r'^ {0,3}([-*+]|\d+[.)])\s')
+# Link reference definitions and footnotes tie blocks together
+CROSS_BLOCK_RE = re.compile(r'^ {0,3}\[[^\]]+\]:|\[\^', re.MULTILINE)
+
+
+def render_markdown(text):
+    """ Renders Markdown without caching, for text that is unlikely to be rendered twice """
+    return markdown2.markdown(text, extras=EXTRAS)
+
+
+def content_hash(text):
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+
+
+def split_blocks(text):
+    """ Splits a Markdown document into top-level blocks at blank lines, keeping fenced
+    code blocks, indented continuations and loose lists (with their indented content and
+    fenced code) in one block """
+    blocks, current = [], []
+    fence = None
+    pending_blank = False
+    for line in text.replace('\r\n', '\n').split('\n'):
+        if fence is not None:
+            current.append(line)
+            if line.strip().startswith(fence) and not line.strip().strip(fence[0]):
+                fence = None
+            continue
+        if not line.strip():
+            if current:
+                pending_blank = True
+            continue
+        if pending_blank:
+            # Indented lines may continue whatever came before (list item content, usually 2-3 spaces, or
+            # indented code); after a list or a quote, fences, further items and quotes still belong to it
+            nested = any(LIST_ITEM_RE.match(previous) or previous.lstrip().startswith('>') for previous in current)
+            continues = line[0] in ' \t' or (nested and (
+                FENCE_RE.match(line) or LIST_ITEM_RE.match(line) or line.lstrip().startswith('>')))
+            if continues:
+                current.append('')
+            else:
+                blocks.append('\n'.join(current))
+                current = []
+            pending_blank = False
+        match = FENCE_RE.match(line)
+        if match:
+            fence = match.group(1)
+        current.append(line)
+    if current:
+        blocks.append('\n'.join(current))
+    return blocks
+
+
+class RenderCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # hash -> html, least recently used first
+        self._lock = threading.Lock()
+
+    def render(self, text, key=None):
+        """ Returns the HTML for a piece of Markdown, rendering it only if it is not cached """
+        key = key or content_hash(text)
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+
+        html = render_markdown(text)
+        cost = len(html) + len(key) + ENTRY_OVERHEAD
+        if cost > self.max_bytes // 8:
+            return html  # too big to be worth evicting everything else for
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = html
+                self.size += cost
+                while self.size > self.max_bytes:
+                    old_key, old_html = self._entries.popitem(last=False)
+                    self.size -= len(old_html) + len(old_key) + ENTRY_OVERHEAD
+        return html
+
+    def render_blocks(self, text):
+        """ Renders a document block by block; returns [(hash, html), ...] """
+        if CROSS_BLOCK_RE.search(text):
+            key = content_hash(text)
+            return [(key, self.render(text, key))]
+        blocks = []
+        for block in split_blocks(text):
+            key = content_hash(block)
+            blocks.append((key, self.render(block, key)))
+        return blocks
+
+    def render_document(self, text):
+        return '\n'.join(html for _, html in self.render_blocks(text))
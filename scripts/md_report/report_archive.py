@@ -0,0 +1,200 @@
+# Report archive for md_report.
+#
+# Reports are still plain Markdown files in saved_data/, but:
+# - every save gets a unique id, which is part of the file name, so two saves in the
+#   same second no longer overwrite each other
+# - files are written to a temporary file, fsynced and renamed into place, so a crash
+#   never leaves a half-written report behind
+# - an SQLite index (saved_data/index.db) records student name, client IP, MAC,
+#   User-Agent and time for every report, plus a full-text index of the contents
+#   (FTS5 when SQLite has it, a plain LIKE search otherwise)
+# - any filtered set of reports can be exported as a ZIP that is streamed file by
+#   file instead of being built in memory
+#
+# Reports saved before the archive existed ({name}@gmail.com_{ddmmYYYY_HHMMSS}.md)
+# are indexed on startup from their file name and metadata lines.
+
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import uuid
+import zipfile
+from datetime import datetime
+
+LEGACY_NAME_RE = re.compile(r'^([a-z]{1,50})@gmail\.com_(\d{8}_\d{6})(?:_([0-9a-f]+))?\.md$')
+METADATA_RE = re.compile(r'^\*\*(User Agent|IP|MAC Address|Time)\*\*: (.*)$', re.MULTILINE)
+CHUNK_SIZE = 64 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    filename TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    ip TEXT,
+    mac TEXT,
+    user_agent TEXT,
+    created TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_name ON reports (name, created);
+CREATE INDEX IF NOT EXISTS reports_ip ON reports (ip, created);
+CREATE INDEX IF NOT EXISTS reports_mac ON reports (mac, created);
+CREATE INDEX IF NOT EXISTS reports_created ON reports (created);
+"""
+COLUMNS = ('id', 'filename', 'name', 'ip', 'mac', 'user_agent', 'created', 'size')
+
+
+class _StreamSink:
+    """ Write-only file object collecting what zipfile writes, so it can be yielded piece by piece """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ReportArchive:
+    def __init__(self, directory, db_path=None):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path or os.path.join(directory, 'index.db')
+        self._local = threading.local()
+        db = self._db()
+        db.execute('PRAGMA journal_mode=WAL')
+        db.executescript(SCHEMA)
+        try:
+            db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS reports_text USING fts5(body)")
+            self.full_text = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5
+            db.execute("CREATE TABLE IF NOT EXISTS reports_text (rowid INTEGER PRIMARY KEY, body TEXT)")
+            self.full_text = False
+
+    def _db(self):
+        """ One connection per thread (Flask serves requests from several threads) """
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.db_path, timeout=30)
+        return db
+
+    def save(self, name, text, ip=None, mac=None, user_agent=None):
+        """ Writes a report atomically, indexes it and returns its index entry """
+        now = datetime.now()
+        report_id = uuid.uuid4().hex[:12]
+        filename = f"{name}@gmail.com_{now.strftime('%d%m%Y_%H%M%S')}_{report_id}.md"
+        data = text.encode('utf-8')
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-', suffix='.md')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, os.path.join(self.directory, filename))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        entry = dict(zip(COLUMNS, (report_id, filename, name, ip, mac, user_agent,
+                                   now.isoformat(timespec='seconds'), len(data))))
+        self._index(entry, text)
+        return entry
+
+    def _index(self, entry, text):
+        db = self._db()
+        with db:
+            cursor = db.execute(f"INSERT INTO reports ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                                [entry[column] for column in COLUMNS])
+            db.execute("INSERT INTO reports_text (rowid, body) VALUES (?, ?)", (cursor.lastrowid, text))
+
+    def backfill(self):
+        """ Indexes report files that are not in the index yet (e.g. saved by older versions); returns how many """
+        indexed = {row[0] for row in self._db().execute("SELECT filename FROM reports")}
+        added = 0
+        for filename in sorted(os.listdir(self.directory)):
+            match = LEGACY_NAME_RE.match(filename)
+            if not match or filename in indexed:
+                continue
+            path = os.path.join(self.directory, filename)
+            with open(path, encoding='utf-8', errors='replace') as f:
+                text = f.read()
+            metadata = dict(METADATA_RE.findall(text[:4096]))
+            name, stamp, report_id = match.groups()
+            created = datetime.strptime(stamp, '%d%m%Y_%H%M%S').isoformat(timespec='seconds')
+            entry = dict(zip(COLUMNS, (report_id or f"legacy-{name}-{stamp}", filename, name,
+                                       metadata.get('IP'), metadata.get('MAC Address'), metadata.get('User Agent'),
+                                       created, os.path.getsize(path))))
+            try:
+                self._index(entry, text)
+                added += 1
+            except sqlite3.IntegrityError:
+                pass  # legacy id clash, the same file is indexed under another name
+        return added
+
+    def find(self, name=None, ip=None, mac=None, since=None, until=None, query=None, limit=100, offset=0):
+        """ Index entries matching all given filters, newest first; `query` is a full-text search """
+        clauses, params = [], []
+        for clause, value in (('r.name = ?', name), ('r.ip = ?', ip), ('r.mac = ?', mac),
+                              ('r.created >= ?', since), ('r.created < ?', until)):
+            if value:
+                clauses.append(clause)
+                params.append(value)
+        join = ''
+        if query:
+            join = 'JOIN reports_text t ON t.rowid = r.rowid'
+            if self.full_text:
+                clauses.append('reports_text MATCH ?')
+                # Search for the words as given instead of interpreting FTS5 query syntax
+                params.append(' '.join('"' + word.replace('"', '""') + '"' for word in query.split()))
+            else:
+                for word in query.split():
+                    clauses.append('t.body LIKE ?')
+                    params.append(f"%{word}%")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        sql = (f"SELECT {', '.join('r.' + column for column in COLUMNS)} FROM reports r {join} {where} "
+               f"ORDER BY r.created DESC, r.rowid DESC")
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        return [dict(zip(COLUMNS, row)) for row in self._db().execute(sql, params)]
+
+    def get(self, report_id):
+        row = self._db().execute(f"SELECT {', '.join(COLUMNS)} FROM reports WHERE id = ?", (report_id,)).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def path(self, entry):
+        return os.path.join(self.directory, entry['filename'])
+
+    def export_zip(self, entries):
+        """ Yields a ZIP archive of the given reports chunk by chunk; only one chunk is held in memory """
+        sink = _StreamSink()
+        with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for entry in entries:
+                try:
+                    source = open(self.path(entry), 'rb')
+                except OSError:
+                    continue  # deleted by hand since it was indexed
+                with source, archive.open(entry['filename'], 'w', force_zip64=True) as target:
+                    while True:
+                        chunk = source.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        target.write(chunk)
+                        if sink.chunks:
+                            yield sink.take()
+                yield sink.take()
+        yield sink.take()
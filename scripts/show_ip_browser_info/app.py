@@ -1,76 +1,35 @@
-from flask import Flask, request, render_template_string
+from flask import Flask
+import argparse
+import atexit
+import os
+import sys
+import tempfile
 
-app = Flask(__name__)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from labtools.serve import add_arguments, serve_from_args
+import client_info
+from visitor_store import VisitorStore
 
-logs = []
-
-@app.route('/')
-def index():
-    user_ip = request.remote_addr
-    user_agent = request.headers.get('User-Agent')
-    user_info = {
-        'IP Address': user_ip,
-        'User Agent': user_agent,
-        'Headers': dict(request.headers)
-    }
-    
-    logs.append({'IP': user_ip, 'Path': request.path, 'User Agent': user_agent})
-    
-    return render_template_string('''
-        <h1>Client Information</h1>
-        <p><strong>IP Address:</strong> {{ user_info['IP Address'] }}</p>
-        <p><strong>User Agent:</strong> {{ user_info['User Agent'] }}</p>
-        <h2>Headers</h2>
-        <ul>
-        {% for key, value in user_info['Headers'].items() %}
-            <li><strong>{{ key }}:</strong> {{ value }}</li>
-        {% endfor %}
-        </ul>
-        <h2>Logs</h2>
-        <ul>
-        {% for log in logs %}
-            <li>
-                <strong>IP:</strong> {{ log['IP'] }} 
-                <strong>Path:</strong> {{ log['Path'] }} 
-                <strong>User Agent:</strong> {{ log['User Agent'] }}
-            </li>
-        {% endfor %}
-        </ul>
-    ''', user_info=user_info, logs=logs)
-
-@app.route('/<path:path>')
-def catch_all(path):
-    user_ip = request.remote_addr
-    user_agent = request.headers.get('User-Agent')
-    user_info = {
-        'IP Address': user_ip,
-        'User Agent': user_agent,
-        'Headers': dict(request.headers)
-    }
-    
-    logs.append({'IP': user_ip, 'Path': request.path, 'User Agent': user_agent})
-    
-    return render_template_string('''
-        <h1>Client Information</h1>
-        <p><strong>IP Address:</strong> {{ user_info['IP Address'] }}</p>
-        <p><strong>User Agent:</strong> {{ user_info['User Agent'] }}</p>
-        <h2>Headers</h2>
-        <ul>
-        {% for key, value in user_info['Headers'].items() %}
-            <li><strong>{{ key }}:</strong> {{ value }}</li>
-        {% endfor %}
-        </ul>
-        <h2>Logs</h2>
-        <ul>
-        {% for log in logs %}
-            <li>
-                <strong>IP:</strong> {{ log['IP'] }} 
-                <strong>Path:</strong> {{ log['Path'] }} 
-                <strong>User Agent:</strong> {{ log['User Agent'] }}
-            </li>
-        {% endfor %}
-        </ul>
-    ''', user_info=user_info, logs=logs)
+def create_app(recent=None, db_path=None):
+    """ Builds the app with its own visitor store (app.extensions['visitor_store']).
+    Visits are kept in memory, or in `db_path` when several worker processes share them. """
+    app = Flask(__name__)
+    recent = recent or int(os.environ.get('VISITOR_RECENT', '1000'))
+    store = VisitorStore(csv_path=None, db_path=db_path, recent=recent, shared=db_path is not None).start()
+    atexit.register(store.close)
+    app.extensions['visitor_store'] = store
+    client_info.register(app, store)
+    return app
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    parser = argparse.ArgumentParser(description='Shows the client IP address, User-Agent and headers')
+    add_arguments(parser, 5000)
+    parser.add_argument('--recent', type=int, default=int(os.environ.get('VISITOR_RECENT', '1000')),
+                        help='Visits kept in memory (default: 1000)')
+    parser.add_argument('--db', help='SQLite database shared by the workers (default: a temporary file with --workers > 1)')
+    args = parser.parse_args()
+
+    db_path = args.db
+    if args.workers > 1 and not db_path:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='show_ip_'), 'visitors.db')
+    serve_from_args(lambda: create_app(args.recent, db_path), args)
@@ -1,111 +1,43 @@
-from flask import Flask, request, render_template_string
-import csv
+from flask import Flask
+import argparse
+import atexit
 import os
-import subprocess
+import sys
 
-app = Flask(__name__)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from labtools.neighbors import get_mac_address
+from labtools.serve import add_arguments, serve_from_args
+import client_info
+from visitor_store import VisitorStore
 
-logs = []
-
-def get_mac_address(ip_address):
-    try:
-        # Виконуємо команду arp для отримання MAC адреси
-        result = subprocess.run(['arp', '-n', ip_address], capture_output=True, text=True)
-        # Парсимо результат команди
-        for line in result.stdout.split('\n'):
-            if ip_address in line:
-                return line.split()[3].upper()
-    except Exception as e:
-        print(f"Error getting MAC address: {e}")
-    return "MAC Address Not Found"
-
-def save_logs_to_csv(logs):
-    file_exists = os.path.isfile('logs.csv')
-    with open('logs.csv', mode='a', newline='') as file:
-        writer = csv.writer(file)
-        if not file_exists:
-            writer.writerow(['MAC', 'IP', 'Path', 'User Agent'])
-        for log in logs:
-            writer.writerow([log['MAC'], log['IP'], log['Path'], log['User Agent']])
-
-@app.route('/')
-def index():
-    user_ip = request.remote_addr
-    user_agent = request.headers.get('User-Agent')
-    mac_address = get_mac_address(user_ip)
-    user_info = {
-        'IP Address': user_ip,
-        'User Agent': user_agent,
-        'MAC': mac_address,
-        'Headers': dict(request.headers)
-    }
-    
-    logs.append({'MAC': mac_address, 'IP': user_ip, 'Path': request.path, 'User Agent': user_agent})
-    save_logs_to_csv(logs)
-    
-    return render_template_string('''
-        <h1>Client Information</h1>
-        <p><strong>IP Address:</strong> {{ user_info['IP Address'] }}</p>
-        <p><strong>MAC:</strong> {{ user_info['MAC'] }}</p>
-        <p><strong>User Agent:</strong> {{ user_info['User Agent'] }}</p>
-       
-        <h2>Headers</h2>
-        <ul>
-        {% for key, value in user_info['Headers'].items() %}
-            <li><strong>{{ key }}:</strong> {{ value }}</li>
-        {% endfor %}
-        </ul>
-        <h2>Logs</h2>
-        <ul>
-        {% for log in logs %}
-            <li>
-                <strong>MAC:</strong> {{ log['MAC'] }} 
-                <strong>IP:</strong> {{ log['IP'] }} 
-                <strong>Path:</strong> {{ log['Path'] }} 
-                <strong>User Agent:</strong> {{ log['User Agent'] }}
-            </li>
-        {% endfor %}
-        </ul>
-    ''', user_info=user_info, logs=logs)
-
-@app.route('/<path:path>')
-def catch_all(path):
-    user_ip = request.remote_addr
-    user_agent = request.headers.get('User-Agent')
-    mac_address = get_mac_address(user_ip)
-    user_info = {
-        'IP Address': user_ip,
-        'User Agent': user_agent,
-        'MAC': mac_address,
-        'Headers': dict(request.headers)
-    }
-    
-    logs.append({'MAC': mac_address, 'IP': user_ip, 'Path': request.path, 'User Agent': user_agent})
-    save_logs_to_csv(logs)
-    
-    return render_template_string('''
-        <h1>Client Information</h1>
-        <p><strong>IP Address:</strong> {{ user_info['IP Address'] }}</p>
-        <p><strong>User Agent:</strong> {{ user_info['User Agent'] }}</p>
-        <p><strong>MAC:</strong> {{ user_info['MAC'] }}</p>
-        <h2>Headers</h2>
-        <ul>
-        {% for key, value in user_info['Headers'].items() %}
-            <li><strong>{{ key }}:</strong> {{ value }}</li>
-        {% endfor %}
-        </ul>
-        <h2>Logs</h2>
-        <ul>
-        {% for log in logs %}
-            <li>
-                <strong>MAC:</strong> {{ log['MAC'] }} 
-                <strong>IP:</strong> {{ log['IP'] }} 
-                <strong>Path:</strong> {{ log['Path'] }} 
-                <strong>User Agent:</strong> {{ log['User Agent'] }}
-            </li>
-        {% endfor %}
-        </ul>
-    ''', user_info=user_info, logs=logs)
+def create_app(csv_path=None, db_path=None, recent=None, shared=False):
+    """ Builds the app with its own visitor store (app.extensions['visitor_store']).
+    Visits are appended to `csv_path` (one row per hit) and, if `db_path` is set, to an SQLite database;
+    the last `recent` visits are kept in memory for the page and the /_logs views. With `shared`, the
+    database is the log shown by every worker process. Unset arguments come from VISITOR_LOG,
+    VISITOR_DB and VISITOR_RECENT. """
+    app = Flask(__name__)
+    store = VisitorStore(csv_path=csv_path or os.environ.get('VISITOR_LOG', 'logs.csv'),
+                         db_path=db_path or os.environ.get('VISITOR_DB') or None,
+                         recent=recent or int(os.environ.get('VISITOR_RECENT', '1000')),
+                         shared=shared).start()
+    atexit.register(store.close)
+    app.extensions['visitor_store'] = store
+    client_info.register(app, store, get_mac_address)
+    return app
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    parser = argparse.ArgumentParser(description='Shows client information and logs every visit with its MAC address')
+    add_arguments(parser, 5000)
+    parser.add_argument('--log', default=os.environ.get('VISITOR_LOG', 'logs.csv'),
+                        help='CSV file the visits are appended to (default: logs.csv)')
+    parser.add_argument('--db', default=os.environ.get('VISITOR_DB'),
+                        help='SQLite database of visits (default: none, or next to the CSV with --workers > 1)')
+    parser.add_argument('--recent', type=int, default=int(os.environ.get('VISITOR_RECENT', '1000')),
+                        help='Visits kept in memory (default: 1000)')
+    args = parser.parse_args()
+
+    db_path = args.db
+    if args.workers > 1 and not db_path:
+        db_path = os.path.splitext(args.log)[0] + '.db'
+    serve_from_args(lambda: create_app(args.log, db_path, args.recent, shared=args.workers > 1), args)
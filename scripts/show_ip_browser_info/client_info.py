@@ -0,0 +1,166 @@
+# Client information page and visitor log routes shared by app.py and app_mac_csv.py.
+#
+# The templates are compiled once when the routes are registered. The page only
+# shows the latest `page_size` visits; older ones are fetched page by page from
+# /_logs, and new ones are pushed to open pages over server-sent events from
+# /_logs/stream, so neither the page nor the log view grows with the number of visitors.
+#
+# /_logs?after=<id>|before=<id>&limit=<n>&format=json|html
+#   A page of visits (oldest first) from the visitor store's ring buffer. Visits
+#   never change once recorded, so a page is identified by the ids it holds (plus the
+#   newest id, which JSON pages report as last_id): the response carries an ETag and
+#   unchanged pages are answered with 304 Not Modified.
+# /_logs/stream?after=<id>
+#   Server-sent events, one "visit" event per new visit, resumable with Last-Event-ID.
+
+import json
+
+from flask import Response, request
+from markupsafe import Markup
+
+PAGE_TEMPLATE = '''
+        <h1>Client Information</h1>
+        <p><strong>IP Address:</strong> {{ user_info['IP Address'] }}</p>
+        {% if show_mac %}<p><strong>MAC:</strong> {{ user_info['MAC'] }}</p>{% endif %}
+        <p><strong>User Agent:</strong> {{ user_info['User Agent'] }}</p>
+        <h2>Headers</h2>
+        <ul>
+        {% for key, value in user_info['Headers'].items() %}
+            <li><strong>{{ key }}:</strong> {{ value }}</li>
+        {% endfor %}
+        </ul>
+        <h2>Logs</h2>
+        {% if first_id > 1 %}<p><a id="older" href="/_logs?before={{ first_id }}&amp;format=html">Older visits</a></p>{% endif %}
+        <ul id="logs">
+        {{ logs_html }}
+        </ul>
+        <script>
+        (function () {
+            var list = document.getElementById('logs');
+            var older = document.getElementById('older');
+            var firstId = {{ first_id }};
+            if (older) {
+                older.addEventListener('click', function (event) {
+                    event.preventDefault();
+                    fetch('/_logs?format=json&before=' + firstId).then(function (r) { return r.json(); }).then(function (page) {
+                        page.logs.slice().reverse().forEach(function (log) { list.insertBefore(item(log), list.firstChild); });
+                        if (page.logs.length) { firstId = page.logs[0].id; }
+                        if (!page.logs.length || firstId <= 1) { older.remove(); }
+                    });
+                });
+            }
+            function item(log) {
+                var li = document.createElement('li');
+                {% for field in fields %}
+                var label = document.createElement('strong');
+                label.textContent = '{{ field }}:';
+                li.appendChild(label);
+                li.appendChild(document.createTextNode(' ' + (log[{{ field|tojson }}] || '') + ' '));
+                {% endfor %}
+                return li;
+            }
+            if (window.EventSource) {
+                var source = new EventSource('/_logs/stream?after={{ last_id }}');
+                source.addEventListener('visit', function (event) { list.appendChild(item(JSON.parse(event.data))); });
+            }
+        })();
+        </script>
+'''
+
+LOGS_TEMPLATE = '''
+        {% for log in logs %}
+            <li>
+                {% for field in fields %}<strong>{{ field }}:</strong> {{ log[field] }} {% endfor %}
+            </li>
+        {% endfor %}
+'''
+
+MAX_PAGE_SIZE = 500
+KEEPALIVE_INTERVAL = 15  # seconds between SSE comments on an idle stream
+
+
+def register(app, store, get_mac_address=None, page_size=50):
+    """ Adds the client information page (/ and every other path) and the log routes to `app`.
+    Visits are recorded in `store`; MAC addresses are looked up and shown only if `get_mac_address` is given. """
+    show_mac = get_mac_address is not None
+    fields = ['MAC', 'IP', 'Path', 'User Agent'] if show_mac else ['IP', 'Path', 'User Agent']
+    page_template = app.jinja_env.from_string(PAGE_TEMPLATE)
+    logs_template = app.jinja_env.from_string(LOGS_TEMPLATE)
+
+    def visible(log):
+        return {'id': log['id'], 'Time': log['Time'], **{field: log[field] for field in fields}}
+
+    def client_info(path=''):
+        user_ip = request.remote_addr
+        user_agent = request.headers.get('User-Agent')
+        mac_address = get_mac_address(user_ip) if show_mac else None
+        user_info = {
+            'IP Address': user_ip,
+            'User Agent': user_agent,
+            'MAC': mac_address,
+            'Headers': dict(request.headers)
+        }
+
+        store.add(mac_address, user_ip, request.path, user_agent)
+
+        logs = store.page(limit=page_size)
+        return page_template.render(
+            user_info=user_info, show_mac=show_mac, fields=fields,
+            logs_html=Markup(logs_template.render(logs=logs, fields=fields)),
+            first_id=logs[0]['id'] if logs else 0, last_id=logs[-1]['id'] if logs else 0)
+
+    def logs_page():
+        # Malformed numbers are ignored, as if the parameter was missing
+        after = request.args.get('after', type=int)
+        before = request.args.get('before', type=int)
+        limit = min(max(request.args.get('limit', page_size, type=int), 1), MAX_PAGE_SIZE)
+        output = 'html' if request.args.get('format') == 'html' else 'json'
+
+        last_id = store.last_id
+        logs = store.page(after=after, before=before, limit=limit)
+        if logs:
+            etag = f"{output}-{limit}-{logs[0]['id']}-{logs[-1]['id']}"
+        else:
+            etag = f"{output}-{limit}-empty-{after}-{before}"
+        if output == 'json':
+            # The JSON body also carries last_id, which changes with every visit
+            etag += f"-{last_id}"
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'}
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers=headers)
+
+        if output == 'html':
+            return Response(logs_template.render(logs=logs, fields=fields), headers=headers, mimetype='text/html')
+        body = json.dumps({
+            'logs': [visible(log) for log in logs],
+            'next': logs[-1]['id'] if logs else after,  # cursor for ?after= to get newer visits
+            'prev': logs[0]['id'] if logs else before,  # cursor for ?before= to get older visits
+            'last_id': last_id,
+        }, ensure_ascii=False)
+        return Response(body, headers=headers, mimetype='application/json')
+
+    def logs_stream():
+        cursor = request.headers.get('Last-Event-ID') or request.args.get('after')
+        try:
+            after = int(cursor) if cursor is not None else store.last_id
+        except ValueError:
+            after = store.last_id
+
+        def events(after):
+            yield "retry: 3000\n\n"
+            while True:
+                logs = store.wait(after, KEEPALIVE_INTERVAL)
+                if not logs:
+                    yield ": keep-alive\n\n"
+                    continue
+                for log in logs:
+                    yield f"event: visit\nid: {log['id']}\ndata: {json.dumps(visible(log), ensure_ascii=False)}\n\n"
+                after = logs[-1]['id']
+
+        return Response(events(after), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    app.add_url_rule('/_logs', 'logs', logs_page)
+    app.add_url_rule('/_logs/stream', 'logs_stream', logs_stream)
+    app.add_url_rule('/', 'index', client_info)
+    app.add_url_rule('/<path:path>', 'catch_all', client_info)
@@ -0,0 +1,253 @@
+# Visitor store for app.py and app_mac_csv.py.
+#
+# Every hit is recorded once:
+# - in memory, in a fixed-size ring buffer holding the most recent visits (what the page shows),
+#   each with an increasing id that clients use as a cursor (see client_info.py)
+# - on disk (app_mac_csv.py), appended as one CSV row to logs.csv by a background writer thread that
+#   drains a bounded queue and writes in batches, so requests never wait for the disk
+# - optionally in an SQLite database indexed by MAC, IP and time, so past visits can be
+#   queried without loading the whole history
+#
+# If the writer falls behind, new records are dropped from the files (and counted) but
+# still show up in the ring buffer.
+#
+# When several worker processes serve the app (see labtools/serve.py) each has its own
+# store, so `shared=True` makes the SQLite database the source of truth instead of the
+# ring buffer: visits are inserted as they happen, their ids are the database row ids
+# and pages/streams are read from the database, so every worker shows the same log.
+# CSV batches from all workers are appended under an exclusive lock.
+
+import csv
+import fcntl
+import io
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from itertools import islice
+
+COLUMNS = ['Time', 'MAC', 'IP', 'Path', 'User Agent']
+
+_STOP = object()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS visits (
+    id INTEGER PRIMARY KEY,
+    time TEXT NOT NULL,
+    mac TEXT,
+    ip TEXT,
+    path TEXT,
+    user_agent TEXT
+);
+CREATE INDEX IF NOT EXISTS visits_time ON visits (time);
+CREATE INDEX IF NOT EXISTS visits_mac ON visits (mac, time);
+CREATE INDEX IF NOT EXISTS visits_ip ON visits (ip, time);
+"""
+
+
+class VisitorStore:
+    def __init__(self, csv_path='logs.csv', db_path=None, recent=1000, batch_size=256,
+                 flush_interval=0.5, queue_size=100000, shared=False):
+        if shared and not db_path:
+            raise ValueError("A shared visitor store needs an SQLite database (db_path)")
+        self.csv_path = csv_path
+        self.db_path = db_path
+        self.shared = shared
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._recent = deque(maxlen=recent)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._next_id = 1
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name='visitor-store-writer', daemon=True)
+        self._columns = COLUMNS
+        self._local = threading.local()
+
+    def start(self):
+        if self.csv_path:
+            self._columns = self._existing_columns() or COLUMNS
+        if self.db_path:
+            with sqlite3.connect(self.db_path, timeout=30) as db:
+                db.execute('PRAGMA journal_mode=WAL')
+                db.executescript(SCHEMA)
+        if self.csv_path or (self.db_path and not self.shared):
+            self._thread.start()
+        return self
+
+    def _db(self):
+        """ Connection for the calling thread (shared mode) """
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.db_path, timeout=30)
+        return db
+
+    def _existing_columns(self):
+        """ Keeps appending in the layout of an existing logs.csv (older files have no Time column) """
+        try:
+            with open(self.csv_path, newline='') as f:
+                return next(csv.reader(f), None)
+        except OSError:
+            return None
+
+    def add(self, mac, ip, path, user_agent):
+        """ Records one visit and returns it; never blocks on the disk """
+        record = {
+            'Time': datetime.now().isoformat(timespec='seconds'),
+            'MAC': mac,
+            'IP': ip,
+            'Path': path,
+            'User Agent': user_agent,
+        }
+        if self.shared:
+            db = self._db()
+            with db:
+                record['id'] = db.execute(
+                    "INSERT INTO visits (time, mac, ip, path, user_agent) VALUES (?, ?, ?, ?, ?)",
+                    (record['Time'], mac, ip, path, user_agent)).lastrowid
+            with self._lock:
+                self._changed.notify_all()
+        else:
+            with self._lock:
+                record['id'] = self._next_id
+                self._next_id += 1
+                self._recent.append(record)
+                self._changed.notify_all()
+        if not (self.csv_path or (self.db_path and not self.shared)):
+            return record
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        return record
+
+    def recent(self, limit=None):
+        """ The most recent visits, oldest first """
+        return self.page(limit=limit or self._recent.maxlen)
+
+    @property
+    def last_id(self):
+        if self.shared:
+            return self._db().execute("SELECT COALESCE(MAX(id), 0) FROM visits").fetchone()[0]
+        return self._next_id - 1
+
+    def page(self, after=None, before=None, limit=50):
+        """ Up to `limit` visits newer than id `after`, or else the `limit` visits older than id `before`
+        (the latest ones if neither is given), oldest first; only visits still in the ring buffer are returned """
+        if self.shared:
+            return self._page_from_db(after, before, limit)
+        with self._lock:
+            if not self._recent:
+                return []
+            first = self._recent[0]['id']  # ids in the buffer are consecutive
+            if after is not None:
+                start = max(after + 1 - first, 0)
+                stop = start + limit
+            else:
+                stop = len(self._recent) if before is None else min(max(before - first, 0), len(self._recent))
+                start = max(stop - limit, 0)
+            return list(islice(self._recent, start, stop))
+
+    def _page_from_db(self, after, before, limit):
+        select = "SELECT id, time, mac, ip, path, user_agent FROM visits"
+        if after is not None:
+            rows = self._db().execute(f"{select} WHERE id > ? ORDER BY id LIMIT ?", (after, limit)).fetchall()
+        elif before is not None:
+            rows = self._db().execute(f"{select} WHERE id < ? ORDER BY id DESC LIMIT ?", (before, limit)).fetchall()[::-1]
+        else:
+            rows = self._db().execute(f"{select} ORDER BY id DESC LIMIT ?", (limit,)).fetchall()[::-1]
+        return [dict(zip(['id'] + COLUMNS, row)) for row in rows]
+
+    def wait(self, after, timeout, limit=100, poll_interval=0.5):
+        """ Waits up to `timeout` seconds for visits newer than id `after` and returns them """
+        if self.shared:
+            # Visits may come from other processes: poll the database
+            deadline = time.monotonic() + timeout
+            while True:
+                logs = self.page(after=after, limit=limit)
+                if logs or time.monotonic() >= deadline:
+                    return logs
+                with self._changed:
+                    self._changed.wait(min(poll_interval, max(deadline - time.monotonic(), 0)))
+        with self._changed:
+            self._changed.wait_for(lambda: self._next_id - 1 > after, timeout)
+        return self.page(after=after, limit=limit)
+
+    def query(self, mac=None, ip=None, since=None, until=None, limit=100):
+        """ Past visits from the SQLite backend, newest first; `since`/`until` are ISO time strings """
+        if not self.db_path:
+            raise RuntimeError("Querying past visits needs the SQLite backend (db_path)")
+        clauses, params = [], []
+        for clause, value in (('mac = ?', mac), ('ip = ?', ip), ('time >= ?', since), ('time < ?', until)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        with sqlite3.connect(self.db_path) as db:
+            rows = db.execute(f"SELECT time, mac, ip, path, user_agent FROM visits {where} "
+                              f"ORDER BY time DESC, id DESC LIMIT ?", (*params, limit)).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def close(self):
+        """ Writes out everything that is queued """
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _run(self):
+        db = sqlite3.connect(self.db_path, timeout=30) if self.db_path and not self.shared else None
+        stop = False
+        while not stop:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stop = True
+                batch = [record for record in batch if record is not _STOP]
+            if not batch:
+                continue
+
+            try:
+                if self.csv_path:
+                    self._write_csv(batch)
+            except Exception as e:
+                print(f"Error writing {self.csv_path}: {e}")
+            try:
+                if db is not None:
+                    with db:
+                        db.executemany(
+                            "INSERT INTO visits (time, mac, ip, path, user_agent) VALUES (?, ?, ?, ?, ?)",
+                            ((r['Time'], r['MAC'], r['IP'], r['Path'], r['User Agent']) for r in batch))
+            except Exception as e:
+                print(f"Error writing {self.db_path}: {e}")
+
+        if db is not None:
+            db.close()
+
+    def _write_csv(self, batch):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for record in batch:
+            writer.writerow([record.get(column, '') for column in self._columns])
+        with open(self.csv_path, 'a', newline='') as f:
+            # Other worker processes append to the same file
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                if f.seek(0, os.SEEK_END) == 0:
+                    header = io.StringIO()
+                    csv.writer(header).writerow(self._columns)
+                    f.write(header.getvalue())
+                f.write(buffer.getvalue())
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
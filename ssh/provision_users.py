@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+# Provisions the students' SSH accounts of ubuntu/create_users.sh and openwrt/create_users.sh
+# on many lab hosts at once:
+# - the users_file (ssh-rsa <key> <username@mail> lines) is parsed once
+# - each host's current state (accounts, authorized_keys checksums, OpenWrt uci users and
+#   Dropbear settings) is read with one command, compared with the users_file, and only
+#   the missing changes are applied, all in one batched shell script (one `uci commit`,
+#   one `sed` over /etc/passwd, ...); a host that is already in sync gets no changes and
+#   its SSH daemon is not restarted
+# - hosts are processed concurrently, and the two commands per host share one SSH
+#   connection (OpenSSH ControlMaster)
+# - provisioned accounts are recorded in /etc/cyberlab-users on the host, so --prune can
+#   remove students that were dropped from the users_file
+# - --fake DIR replaces SSH with local JSON files (DIR/<host>.json) to try it without hosts
+#
+# Usage:
+# - python3 provision_users.py -u users.txt --flavor openwrt --host root@192.168.1.1 --host root@192.168.1.2
+# - python3 provision_users.py -u users.txt --hosts-file hosts.txt --prune
+# - python3 provision_users.py -u users.txt --hosts-file hosts.txt -r
+# - python3 provision_users.py -u users.txt --hosts-file hosts.txt --dry-run
+#
+# hosts.txt: one `[user@]host[:port] [ubuntu|openwrt]` per line (the flavor defaults to --flavor)
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+USERNAME_RE = re.compile(r'^[a-z_][a-z0-9_-]{0,31}$')
+KEY_RE = re.compile(r'^(ssh-(rsa|dss|ed25519)|ecdsa-sha2-nistp\d+|sk-[a-z0-9-]+@openssh\.com) [A-Za-z0-9+/=]+$')
+MANAGED_FILE = '/etc/cyberlab-users'
+
+_print_lock = threading.Lock()
+
+
+def say(text):
+    """ print() for output that host workers produce at the same time """
+    with _print_lock:
+        print(text, flush=True)
+
+
+def parse_users_file(path):
+    """ Reads `ssh-rsa <key> <username@mail>` lines into {username: key line}; bad lines are reported and skipped """
+    users = {}
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = line.split()
+            if len(fields) < 3:
+                print(f"{path}:{number}: expected 'ssh-rsa <key> <username@mail>', skipped")
+                continue
+            key_line = ' '.join(fields[:3])
+            username = fields[2].split('@')[0]
+            if not USERNAME_RE.match(username) or not KEY_RE.match(' '.join(fields[:2])) or "'" in fields[2]:
+                print(f"{path}:{number}: invalid user name or key, skipped")
+                continue
+            if username in users:
+                print(f"{path}:{number}: {username} appears again, the last key is used")
+            users[username] = key_line
+    return users
+
+
+def key_digest(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class HostState:
+    """ What a host has of the users we care about """
+
+    def __init__(self):
+        self.homes = {}  # /etc/passwd: username -> home directory
+        self.registered = {}  # OpenWrt uci: username -> section id
+        self.key_digests = {}  # username -> sha256 of ~/.ssh/authorized_keys
+        self.managed = set()  # accounts provisioned by this tool
+        self.settings = {}  # uci option -> value
+
+
+class Ubuntu:
+    """ Accounts as ubuntu/create_users.sh makes them: nologin shell, the key line as is """
+
+    name = 'ubuntu'
+    settings = {}
+
+    def authorized_keys(self, key_line, args):
+        return key_line + '\n'
+
+    def home(self, username):
+        return f"/home/{username}"
+
+    def gather_script(self, names):
+        return STATE_SCRIPT.format(names=' '.join(names), settings='', uci=':')
+
+    def plan_user(self, username, state):
+        return [] if username in state.homes else [('add_account', username)]
+
+    def render(self, operations):
+        lines = []
+        for operation in operations:
+            kind = operation[0]
+            if kind == 'add_account':
+                username = operation[1]
+                lines.append(f"useradd -m -s /usr/sbin/nologin {username} || echo 'failed: useradd {username}'")
+            elif kind == 'write_keys':
+                username, home, content = operation[1:]
+                lines.append(write_keys_command(shlex.quote(home), content, f"{username}:{username}"))
+            elif kind == 'remove':
+                username = operation[1]
+                lines.append(f"userdel -r {username} 2>/dev/null || echo 'failed: userdel {username}'")
+            elif kind == 'managed':
+                lines.append(managed_command(operation[1]))
+        return '\n'.join(lines) + '\n'
+
+
+class OpenWrt:
+    """ Accounts as openwrt/create_users.sh makes them: a uci user, a /etc/passwd line and a
+    key that can only open a tunnel to the target server, with Dropbear password logins off """
+
+    name = 'openwrt'
+    settings = {
+        'dropbear.@dropbear[0].Port': '22',
+        'dropbear.@dropbear[0].PasswordAuth': 'off',
+        'dropbear.@dropbear[0].RootPasswordAuth': 'off',
+        'system.@system[0].ttylogin': '0',
+    }
+
+    def authorized_keys(self, key_line, args):
+        return (f'command="/usr/bin/nc -q0 {args.proxy_target} 22",no-agent-forwarding,no-X11-forwarding,no-pty '
+                f'{key_line}\n')
+
+    def home(self, username):
+        return f"/home/{username}"
+
+    def gather_script(self, names):
+        settings = ' '.join(shlex.quote(option) for option in self.settings)
+        return STATE_SCRIPT.format(names=' '.join(names), settings=settings,
+                                   uci="uci -X show system 2>/dev/null | grep '\\.username='")
+
+    def plan_user(self, username, state):
+        operations = []
+        if username not in state.registered:
+            operations.append(('register', username))
+        if username not in state.homes:
+            operations.append(('add_account', username))
+        return operations
+
+    def render(self, operations):
+        lines, passwd_removals = [], []
+        commit = set()
+        restart = False
+        for operation in operations:
+            kind = operation[0]
+            if kind == 'register':
+                username = operation[1]
+                lines += ["uci add system user >/dev/null",
+                          f"uci set system.@user[-1].username='{username}'",
+                          f"uci set system.@user[-1].home='/home/{username}'",
+                          "uci set system.@user[-1].shell='/bin/false'"]
+                commit.add('system')
+            elif kind == 'add_account':
+                username = operation[1]
+                lines.append(f"echo '{username}:x:1000:1000:{username}:/home/{username}:/bin/ash' >> /etc/passwd")
+            elif kind == 'write_keys':
+                lines.append(write_keys_command(shlex.quote(operation[2]), operation[3], '1000:1000'))
+            elif kind == 'remove':
+                username, home, section = operation[1:]
+                if section:
+                    lines.append(f"uci delete system.{section}")
+                    commit.add('system')
+                passwd_removals.append(username)
+                lines.append(f"rm -rf {shlex.quote(home)}")
+            elif kind == 'set':
+                option, value = operation[1:]
+                lines.append(f"uci set {option}={shlex.quote(value)}")
+                commit.add(option.split('.')[0])
+            elif kind == 'managed':
+                lines.append(managed_command(operation[1]))
+            elif kind == 'restart':
+                restart = True
+        if passwd_removals:
+            # One pass over /etc/passwd for all removed users
+            lines.insert(0, "sed -i " + ' '.join(f"-e '/^{username}:/d'" for username in passwd_removals)
+                         + " /etc/passwd")
+        lines += [f"uci commit {config}" for config in sorted(commit)]
+        if restart:
+            lines.append("/etc/init.d/dropbear restart")
+        return '\n'.join(lines) + '\n'
+
+
+FLAVORS = {'ubuntu': Ubuntu(), 'openwrt': OpenWrt()}
+
+# Prints the state of the given users in sections; runs on bash and on OpenWrt's ash
+STATE_SCRIPT = r"""
+echo '#passwd'; cat /etc/passwd
+echo '#managed'; cat {managed} 2>/dev/null
+echo '#uci'; {uci}
+echo '#settings'
+for option in {settings}; do echo "$option=$(uci -q get "$option")"; done
+echo '#keys'
+for user in {names}; do
+    home=$(awk -F: -v user="$user" '$1 == user {{ print $6 }}' /etc/passwd)
+    [ -n "$home" ] && [ -f "$home/.ssh/authorized_keys" ] && echo "$user $(sha256sum "$home/.ssh/authorized_keys" | cut -d' ' -f1)"
+done
+exit 0
+""".replace('{managed}', MANAGED_FILE)
+
+
+def write_keys_command(home, content, owner):
+    return (f"mkdir -p {home}/.ssh && printf '%s' {shlex.quote(content)} > {home}/.ssh/authorized_keys && "
+            f"chmod 700 {home}/.ssh && chmod 600 {home}/.ssh/authorized_keys && chown -R {owner} {home}/.ssh "
+            f"|| echo 'failed: keys in {home}'")
+
+
+def managed_command(names):
+    return f"printf '%s\\n' {' '.join(names)} > {MANAGED_FILE}" if names else f"rm -f {MANAGED_FILE}"
+
+
+def parse_state(output):
+    """ Reads the sections printed by STATE_SCRIPT """
+    state = HostState()
+    section = None
+    for line in output.splitlines():
+        if line.startswith('#') and line[1:] in ('passwd', 'managed', 'uci', 'settings', 'keys'):
+            section = line[1:]
+        elif section == 'passwd':
+            fields = line.split(':')
+            if len(fields) >= 6:
+                state.homes[fields[0]] = fields[5]
+        elif section == 'managed' and line.strip():
+            state.managed.add(line.strip())
+        elif section == 'uci':
+            # system.cfg0a1b2c.username='student'
+            option, _, value = line.partition('=')
+            state.registered[value.strip("'")] = option.split('.')[1]
+        elif section == 'settings':
+            option, _, value = line.partition('=')
+            state.settings[option] = value
+        elif section == 'keys':
+            username, _, digest = line.partition(' ')
+            state.key_digests[username] = digest
+    return state
+
+
+def plan(flavor, users, state, args):
+    """ Operations bringing the host from `state` to the users_file; ([operations], {what: count}) """
+    operations, counts = [], {'created': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+    wanted = {} if args.remove else users
+    doomed = set(users) if args.remove else set()
+    if args.prune:
+        doomed |= state.managed - set(users)
+    for username in sorted(doomed):
+        home = state.homes.get(username) or flavor.home(username)
+        if not home.startswith('/home/'):
+            continue  # never a student account (e.g. root@... in the users file)
+        if username in state.homes or username in state.registered:
+            operations.append(('remove', username, home, state.registered.get(username)))
+            counts['removed'] += 1
+
+    for username, key_line in sorted(wanted.items()):
+        create = flavor.plan_user(username, state)
+        content = flavor.authorized_keys(key_line, args)
+        write_keys = bool(create) or state.key_digests.get(username) != key_digest(content)
+        operations += create
+        if write_keys:
+            operations.append(('write_keys', username, state.homes.get(username) or flavor.home(username), content))
+        counts['created' if create else 'updated' if write_keys else 'unchanged'] += 1
+
+    settings_changed = False
+    if not args.remove:
+        for option, value in flavor.settings.items():
+            if state.settings.get(option) != value:
+                operations.append(('set', option, value))
+                settings_changed = True
+
+    managed = (state.managed - doomed) | set(wanted)
+    if managed != state.managed:
+        operations.append(('managed', sorted(managed)))
+    if settings_changed:
+        # Dropbear reads authorized_keys on every login; only a changed config needs a restart
+        operations.append(('restart',))
+    return operations, counts
+
+
+class SSHHost:
+    """ A lab host reached with the ssh client; all commands go through one master connection """
+
+    def __init__(self, target, control_dir, identity=None, timeout=10):
+        host, _, port = target.rpartition(':') if target.count(':') == 1 else (target, '', '')
+        self.target = host
+        self.options = ['-o', 'BatchMode=yes', '-o', f'ConnectTimeout={timeout}',
+                        '-o', 'ControlMaster=auto', '-o', f'ControlPath={control_dir}/%C', '-o', 'ControlPersist=60']
+        if port:
+            self.options += ['-p', port]
+        if identity:
+            self.options += ['-i', identity]
+
+    def run(self, script):
+        result = subprocess.run(['ssh'] + self.options + [self.target, 'sh -s'], input=script, text=True,
+                                capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or f"exit status {result.returncode}")
+        return result.stdout
+
+    def fetch_state(self, flavor, names):
+        return parse_state(self.run(flavor.gather_script(names)))
+
+    def apply(self, flavor, operations):
+        failures = [line for line in self.run(flavor.render(operations)).splitlines() if line.startswith('failed:')]
+        if failures:
+            raise RuntimeError('; '.join(failures))
+
+    def close(self):
+        subprocess.run(['ssh'] + self.options + ['-O', 'exit', self.target], capture_output=True)
+
+
+class FakeHost:
+    """ A host kept in a local JSON file, for trying the tool without lab hosts """
+
+    def __init__(self, target, directory, latency=0.0):
+        self.path = os.path.join(directory, re.sub(r'[^A-Za-z0-9_.-]', '_', target) + '.json')
+        self.latency = latency  # simulated round trip per command
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'passwd': {'root': '/root'}, 'uci': {}, 'keys': {}, 'managed': [], 'settings': {}, 'restarts': 0}
+
+    def fetch_state(self, flavor, names):
+        time.sleep(self.latency)
+        host = self._load()
+        state = HostState()
+        state.homes = dict(host['passwd'])
+        state.registered = dict(host['uci']) if flavor.name == 'openwrt' else {}
+        state.key_digests = {name: key_digest(host['keys'][name]) for name in names if name in host['keys']}
+        state.managed = set(host['managed'])
+        state.settings = {option: host['settings'].get(option, '') for option in flavor.settings}
+        return state
+
+    def apply(self, flavor, operations):
+        time.sleep(self.latency)
+        host = self._load()
+        for operation in operations:
+            kind = operation[0]
+            if kind == 'register':
+                host['uci'][operation[1]] = f"cfg{len(host['uci']):06x}"
+            elif kind == 'add_account':
+                host['passwd'][operation[1]] = flavor.home(operation[1])
+            elif kind == 'write_keys':
+                host['keys'][operation[1]] = operation[3]
+            elif kind == 'remove':
+                for table in ('passwd', 'uci', 'keys'):
+                    host[table].pop(operation[1], None)
+            elif kind == 'set':
+                host['settings'][operation[1]] = operation[2]
+            elif kind == 'managed':
+                host['managed'] = operation[1]
+            elif kind == 'restart':
+                host['restarts'] += 1
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(host, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        pass
+
+
+def provision(host, target, flavor, users, args):
+    """ Brings one host in sync; returns a one-line summary """
+    started = time.monotonic()
+    try:
+        state = host.fetch_state(flavor, sorted(users))
+        operations, counts = plan(flavor, users, state, args)
+        summary = ', '.join(f"{count} {what}" for what, count in counts.items() if count)
+        if not operations:
+            return f"{target}: in sync ({summary or 'no users'}), {time.monotonic() - started:.1f}s"
+        if args.dry_run:
+            return f"{target}: would apply ({summary}):\n" + flavor.render(operations).rstrip()
+        host.apply(flavor, operations)
+        return f"{target}: {summary}, {len(operations)} changes in {time.monotonic() - started:.1f}s"
+    finally:
+        host.close()
+
+
+def read_hosts(args):
+    """ [(target, flavor name), ...] from --host and --hosts-file """
+    hosts = [(target, args.flavor) for target in args.host]
+    if args.hosts_file:
+        with open(args.hosts_file, encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                fields = line.split('#')[0].split()
+                if not fields:
+                    continue
+                flavor = fields[1] if len(fields) > 1 else args.flavor
+                if flavor not in FLAVORS:
+                    print(f"{args.hosts_file}:{number}: unknown flavor {flavor}, skipped")
+                    continue
+                hosts.append((fields[0], flavor))
+    return hosts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Creates, updates and removes lab SSH accounts on many hosts at once')
+    parser.add_argument('-u', '--users-file', required=True, help='File of "ssh-rsa <key> <username@mail>" lines')
+    parser.add_argument('-r', '--remove', action='store_true', help='Remove the users listed in the users file')
+    parser.add_argument('--prune', action='store_true',
+                        help='Also remove accounts provisioned earlier that are no longer in the users file')
+    parser.add_argument('--host', action='append', default=[], help='[user@]host[:port], may be repeated')
+    parser.add_argument('--hosts-file', help='File with one "[user@]host[:port] [ubuntu|openwrt]" per line')
+    parser.add_argument('--flavor', choices=FLAVORS, default='openwrt', help='Host type (default: openwrt)')
+    parser.add_argument('--proxy-target', default='target-server',
+                        help='Server OpenWrt keys tunnel to with nc (default: target-server)')
+    parser.add_argument('-i', '--identity', help='SSH private key for logging in to the hosts')
+    parser.add_argument('--parallel', type=int, default=16, help='Hosts processed at the same time (default: 16)')
+    parser.add_argument('--dry-run', action='store_true', help='Print the changes instead of applying them')
+    parser.add_argument('--fake', metavar='DIR', help='Use local JSON files in DIR instead of SSH hosts')
+    parser.add_argument('--fake-latency', type=float, default=0.0,
+                        help='Simulated seconds per command on fake hosts (default: 0)')
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.users_file):
+        print(f"Error: File '{args.users_file}' not found.")
+        sys.exit(1)
+    users = parse_users_file(args.users_file)
+    hosts = read_hosts(args)
+    if not hosts:
+        print("Error: no hosts given, use --host or --hosts-file")
+        sys.exit(1)
+    if args.fake:
+        os.makedirs(args.fake, exist_ok=True)
+    elif shutil.which('ssh') is None:
+        print("Error: ssh client not installed")
+        sys.exit(1)
+
+    control_dir = tempfile.mkdtemp(prefix='provision-')
+    started = time.monotonic()
+    failures = 0
+    try:
+        with ThreadPoolExecutor(max_workers=args.parallel) as pool:
+            futures = {}
+            for target, flavor in hosts:
+                host = (FakeHost(target, args.fake, args.fake_latency) if args.fake
+                        else SSHHost(target, control_dir, args.identity))
+                futures[pool.submit(provision, host, target, FLAVORS[flavor], users, args)] = target
+            for future in as_completed(futures):
+                try:
+                    say(future.result())
+                except Exception as e:
+                    failures += 1
+                    say(f"{futures[future]}: failed: {e}")
+    finally:
+        shutil.rmtree(control_dir, ignore_errors=True)
+    print(f"{len(users)} users on {len(hosts) - failures}/{len(hosts)} hosts in {time.monotonic() - started:.1f}s")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1 @@
+# Shared building blocks for the honeypot scripts in this directory.
@@ -0,0 +1,162 @@
+# Non-blocking JSON Lines log writer for honeypot auth attempts.
+#
+# The serving path only puts a record (a dict) on a bounded queue. A background
+# thread drains the queue in batches, serializes every record as one JSON object
+# per line, writes and flushes each batch at once, and fsyncs at most every
+# `fsync_interval` seconds. The log is rotated when it grows past `max_bytes` or
+# becomes older than `max_age` seconds, and rotated segments can be compressed
+# with gzip or zstd (zstd needs the optional `zstandard` package).
+#
+# If the writer falls behind (e.g. the disk stalls during a scan burst) new
+# records are dropped and counted instead of blocking the event loop.
+
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_STOP = object()
+
+
+class AuthLogWriter:
+    def __init__(self, path, max_bytes=0, max_age=0, compress=None, fsync_interval=1.0,
+                 batch_size=512, queue_size=100000):
+        if compress not in (None, 'gzip', 'zstd'):
+            raise ValueError(f"Unknown compression: {compress}")
+        if compress == 'zstd' and zstandard is None:
+            raise RuntimeError("zstd compression needs the 'zstandard' package (pip install zstandard)")
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+        self.fsync_interval = fsync_interval
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name='auth-log-writer', daemon=True)
+        self._file = None
+        self._opened_at = 0.0
+        self._synced_at = 0.0
+        self._dirty = False
+
+    def start(self):
+        self._open()
+        self._thread.start()
+        return self
+
+    def log(self, record):
+        """ Queues a record (a dict, or an already serialized JSON line) for writing; never blocks """
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def close(self):
+        """ Writes out everything that is queued and closes the log """
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _open(self):
+        self._file = open(self.path, 'ab')
+        self._opened_at = time.time()
+
+    def _run(self):
+        stop = False
+        while not stop:
+            try:
+                batch = [self._queue.get(timeout=self.fsync_interval)]
+            except queue.Empty:
+                batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stop = True
+                batch = [record for record in batch if record is not _STOP]
+
+            try:
+                if batch:
+                    self._write(batch)
+                self._maybe_sync(force=stop)
+                self._maybe_rotate()
+            except Exception as e:
+                print(f"Error writing auth log: {e}")
+
+        self._file.close()
+
+    def _write(self, batch):
+        lines = []
+        for record in batch:
+            if isinstance(record, str):
+                lines.append(record)  # already serialized, e.g. forwarded by a prefork worker
+                continue
+            try:
+                lines.append(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+            except (TypeError, ValueError) as e:
+                print(f"Skipping unserializable log record: {e}")
+        if lines:
+            self._file.write(('\n'.join(lines) + '\n').encode('utf-8', 'backslashreplace'))
+            self._file.flush()
+            self._dirty = True
+
+    def _maybe_sync(self, force=False):
+        now = time.monotonic()
+        if self._dirty and (force or now - self._synced_at >= self.fsync_interval):
+            os.fsync(self._file.fileno())
+            self._synced_at = now
+            self._dirty = False
+
+    def _maybe_rotate(self):
+        size = self._file.tell()
+        if not size:
+            return
+        too_big = self.max_bytes and size >= self.max_bytes
+        too_old = self.max_age and time.time() - self._opened_at >= self.max_age
+        if not (too_big or too_old):
+            return
+
+        self._maybe_sync(force=True)
+        self._file.close()
+        base = f"{self.path}.{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        segment, suffix = base, 1
+        while os.path.exists(segment) or os.path.exists(f"{segment}.gz") or os.path.exists(f"{segment}.zst"):
+            segment = f"{base}.{suffix}"
+            suffix += 1
+        os.rename(self.path, segment)
+        self._open()
+
+        if self.compress:
+            # Compress in a separate thread so writing the new segment is not held up
+            threading.Thread(target=compress_segment, args=(segment, self.compress), daemon=True).start()
+
+
+def compress_segment(segment, method):
+    """ Compresses a rotated log segment next to itself and removes the original """
+    target = segment + ('.gz' if method == 'gzip' else '.zst')
+    try:
+        with open(segment, 'rb') as src:
+            if method == 'gzip':
+                with gzip.open(target + '.tmp', 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+            else:
+                with open(target + '.tmp', 'wb') as raw:
+                    zstandard.ZstdCompressor().copy_stream(src, raw)
+        os.replace(target + '.tmp', target)
+        os.remove(segment)
+    except Exception as e:
+        print(f"Error compressing {segment}: {e}")
@@ -0,0 +1,122 @@
+# Incremental HTTP/1.x request parser for the honeypot.
+#
+# Bytes are fed in as they arrive from the socket; the parser looks for the end
+# of the header block without rescanning data it has already seen, builds a
+# case-insensitive header map in a single pass and then waits for the
+# Content-Length body, so POSTed credentials are captured too. Header and body
+# sizes are bounded, and nothing is ever decoded strictly: header values that
+# are not valid UTF-8 are kept with backslash escapes instead of dropping the
+# connection. Several pipelined requests can sit in the buffer at once.
+
+
+class ParseError(Exception):
+    pass
+
+
+class HTTPRequest:
+    def __init__(self, method, target, version, headers, body=b''):
+        self.method = method
+        self.target = target
+        self.version = version
+        self.headers = headers  # lower-case name -> value
+        self.body = body
+        self.keep_alive = self._wants_keep_alive()
+
+    def _wants_keep_alive(self):
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.1':
+            return 'close' not in connection
+        return 'keep-alive' in connection
+
+    def head_text(self):
+        """ Request line and headers as text, for printing """
+        lines = [f"{self.method} {self.target} {self.version}"]
+        lines += [f"{name}: {value}" for name, value in self.headers.items()]
+        return "\r\n".join(lines)
+
+
+def _decode(data):
+    return data.decode('utf-8', 'backslashreplace')
+
+
+class RequestParser:
+    def __init__(self, max_header_bytes=8192, max_body_bytes=65536):
+        self.max_header_bytes = max_header_bytes
+        self.max_body_bytes = max_body_bytes
+        self._buffer = bytearray()
+        self._scan_from = 0
+        self._pending = None  # request whose head is parsed but body is incomplete
+        self._body_length = 0
+
+    def feed(self, data):
+        self._buffer += data
+
+    def has_buffered_data(self):
+        return bool(self._buffer) or self._pending is not None
+
+    def next_request(self):
+        """ Returns the next complete request, or None if more data is needed """
+        if self._pending is None:
+            # Tolerate empty lines between requests (RFC 9112, section 2.2)
+            while self._buffer[:1] in (b'\r', b'\n') and self._buffer[:2] != b'\r':
+                del self._buffer[:1]
+                self._scan_from = 0
+
+            # The header block ends with an empty line (CRLF, or a bare LF from sloppy clients)
+            ends = [self._buffer.find(b'\n\r\n', max(self._scan_from - 2, 0)),
+                    self._buffer.find(b'\n\n', max(self._scan_from - 1, 0))]
+            ends = [pos + 3 - i for i, pos in enumerate(ends) if pos != -1]
+            end = min(ends) if ends else -1
+            if end == -1:
+                if len(self._buffer) > self.max_header_bytes:
+                    raise ParseError("Request header too large")
+                self._scan_from = len(self._buffer)
+                return None
+            if end > self.max_header_bytes:
+                raise ParseError("Request header too large")
+
+            head = bytes(self._buffer[:end])
+            del self._buffer[:end]
+            self._scan_from = 0
+            self._pending = self._parse_head(head)
+
+        if len(self._buffer) < self._body_length:
+            return None
+
+        request = self._pending
+        request.body = bytes(self._buffer[:self._body_length])
+        del self._buffer[:self._body_length]
+        self._pending = None
+        self._body_length = 0
+        return request
+
+    def _parse_head(self, head):
+        lines = head.split(b'\n')
+        request_line = lines[0].rstrip(b'\r').split()
+        if len(request_line) == 2:
+            request_line.append(b'HTTP/1.0')
+        if len(request_line) != 3:
+            raise ParseError(f"Malformed request line: {_decode(lines[0])!r}")
+        method, target, version = (_decode(part) for part in request_line)
+        if not version.startswith('HTTP/'):
+            raise ParseError(f"Malformed request line: {_decode(lines[0])!r}")
+
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.rstrip(b'\r').partition(b':')
+            if not sep:
+                continue
+            name = _decode(name.strip()).lower()
+            value = _decode(value.strip())
+            headers[name] = f"{headers[name]}, {value}" if name in headers else value
+
+        if 'transfer-encoding' in headers:
+            raise ParseError("Transfer-Encoding is not supported")
+        length = headers.get('content-length', '0')
+        if not length.isdigit():
+            raise ParseError(f"Invalid Content-Length: {length!r}")
+        if int(length) > self.max_body_bytes:
+            raise ParseError("Request body too large")
+        self._body_length = int(length)
+
+        return HTTPRequest(method, target, version, headers)
@@ -0,0 +1,163 @@
+# Low-overhead metrics for the honeypot's request path.
+#
+# Counters and fixed-bucket latency histograms are plain dicts updated from the
+# event loop thread (one perf_counter() call and a bisect per observation), so
+# they can stay on in production. They are rendered in the Prometheus text
+# format on a separate admin port and can be dumped to a file on SIGUSR1.
+#
+# Stages timed for every request:
+#   accept      - from accept() returning to the connection task starting (event loop lag)
+#   recv        - waiting for the request bytes to arrive
+#   parse       - feeding bytes to the parser and building the request
+#   mac_lookup  - neighbour table lookup
+#   log_enqueue - handing the record to the log writer
+#   send        - writing the response and waiting for the socket to drain
+#
+# Paths and methods are folded into a small fixed set of label values so that
+# scanners requesting random URLs cannot blow up the number of series.
+
+import asyncio
+import bisect
+import os
+
+STAGES = ('accept', 'recv', 'parse', 'mac_lookup', 'log_enqueue', 'send')
+METHODS = ('GET', 'POST', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'CONNECT', 'TRACE', 'PATCH')
+BUCKETS = (0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+           0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+def _escape(value):
+    """ Escapes a label value as the Prometheus text format requires """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class Metrics:
+    def __init__(self, paths=()):
+        self.paths = set(paths)
+        self.stages = {stage: Histogram() for stage in STAGES}
+        self.requests = {}  # (persona, method, path, code) -> Histogram of request durations
+        self.counters = {
+            'connections_accepted': 0,
+            'connections_timed_out': 0,
+            'connections_idle_closed': 0,
+            'connections_reset': 0,
+            'parse_errors': 0,
+        }
+        self.gauges = {}  # name -> (help, callable)
+
+    def add_gauge(self, name, help_text, read):
+        self.gauges[name] = (help_text, read)
+
+    def inc(self, counter):
+        self.counters[counter] += 1
+
+    def observe_stage(self, stage, seconds):
+        self.stages[stage].observe(seconds)
+
+    def observe_request(self, persona, method, path, code, seconds):
+        key = (persona,
+               method if method in METHODS else 'other',
+               path if path in self.paths else 'other',
+               code)
+        histogram = self.requests.get(key)
+        if histogram is None:
+            histogram = self.requests[key] = Histogram()
+        histogram.observe(seconds)
+
+    def render(self):
+        """ Returns all metrics in the Prometheus text exposition format """
+        out = []
+        for name, value in self.counters.items():
+            out.append(f"# TYPE honeypot_{name}_total counter")
+            out.append(f"honeypot_{name}_total {value}")
+
+        for name, (help_text, read) in self.gauges.items():
+            try:
+                value = read()
+            except Exception:
+                continue
+            out.append(f"# HELP honeypot_{name} {help_text}")
+            out.append(f"# TYPE honeypot_{name} gauge")
+            out.append(f"honeypot_{name} {value}")
+
+        out.append("# HELP honeypot_requests_total Requests answered, by persona, method, path and response code")
+        out.append("# TYPE honeypot_requests_total counter")
+        for (persona, method, path, code), histogram in sorted(self.requests.items()):
+            labels = _labels(persona=persona, method=method, path=path, code=code)
+            out.append(f"honeypot_requests_total{labels} {histogram.count}")
+
+        out.append("# HELP honeypot_request_duration_seconds From a complete request to the response being sent")
+        out.append("# TYPE honeypot_request_duration_seconds histogram")
+        for (persona, method, path, code), histogram in sorted(self.requests.items()):
+            self._render_histogram(out, 'honeypot_request_duration_seconds', histogram,
+                                   persona=persona, method=method, path=path, code=code)
+
+        out.append("# HELP honeypot_stage_duration_seconds Time spent in each stage of request handling")
+        out.append("# TYPE honeypot_stage_duration_seconds histogram")
+        for stage, histogram in self.stages.items():
+            self._render_histogram(out, 'honeypot_stage_duration_seconds', histogram, stage=stage)
+        return '\n'.join(out) + '\n'
+
+    @staticmethod
+    def _render_histogram(out, name, histogram, **labels):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), histogram.counts):
+            cumulative += count
+            out.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+        out.append(f"{name}_sum{_labels(**labels)} {histogram.sum:.6f}")
+        out.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+
+    def dump(self, path):
+        """ Writes the current metrics to `path` (used for SIGUSR1) """
+        try:
+            with open(path + '.tmp', 'w') as f:
+                f.write(self.render())
+            os.replace(path + '.tmp', path)
+            print(f"Metrics written to {path}")
+        except OSError as e:
+            print(f"Error writing metrics to {path}: {e}")
+
+
+async def start_admin_server(metrics, host, port):
+    """ Serves GET /metrics on a separate port """
+
+    async def handle(reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 5)
+            # Skip the rest of the request header
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b'\r\n', b'\n', b''):
+                pass
+            parts = request_line.split()
+            if len(parts) >= 2 and parts[0] == b'GET' and parts[1].split(b'?')[0] == b'/metrics':
+                status, body = '200 OK', metrics.render().encode('utf-8')
+            else:
+                status, body = '404 Not Found', b'Not Found\n'
+            writer.write(f"HTTP/1.0 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port, reuse_address=True)
+    print(f"Metrics available on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,105 @@
+# Device personas for the honeypot.
+#
+# A persona is a directory with a persona.json describing one emulated device
+# (its ports, Server banner, pages and auth challenges) plus the page files it
+# refers to. All personas found in a directory are loaded once at startup and
+# every response is pre-rendered (see responses.py), so one process can serve
+# a dozen devices on a dozen ports from the same event loop.
+#
+# persona.json:
+#   name                - device name, used in logs and metrics
+#   ports               - ports the device listens on
+#   server              - Server header, added to every response unless it sets "server": false
+#   methods             - methods answered normally; others get "method_not_allowed"
+#   routes              - path -> response
+#   default             - response for every other path
+#   method_not_allowed  - response for methods not in "methods"
+#
+# A response has a "status", optional "headers" ([name, value] pairs, in
+# order), and either a "body" string or a "file" relative to the persona
+# directory (".gz" files are served gzipped as they are). "auth" adds a
+# WWW-Authenticate challenge: {"scheme": "Digest" or "Basic", "realm", and for
+# Digest "qop", "nonce" (random per start if omitted), "stale", ...}.
+
+import gzip
+import json
+import os
+
+from .responses import Response
+
+# Compress text pages at load time so gzip-capable clients get the smaller variant
+COMPRESS_MIN_SIZE = 1024
+
+
+def auth_challenge(auth):
+    scheme = auth.get('scheme', 'Digest')
+    params = {key: value for key, value in auth.items() if key != 'scheme'}
+    if scheme == 'Digest':
+        params.setdefault('nonce', os.urandom(4).hex())
+    order = ['realm', 'qop', 'nonce', 'opaque', 'stale', 'algorithm']
+    keys = [key for key in order if key in params] + [key for key in params if key not in order]
+    parts = []
+    for key in keys:
+        # stale and algorithm are tokens, everything else is a quoted string
+        value = params[key]
+        parts.append(f'{key}={value}' if key in ('stale', 'algorithm') else f'{key}="{value}"')
+    return f"{scheme} {', '.join(parts)}"
+
+
+def build_response(directory, spec, server):
+    headers = []
+    if 'auth' in spec:
+        headers.append(('WWW-Authenticate', auth_challenge(spec['auth'])))
+    headers += [tuple(header) for header in spec.get('headers', [])]
+    if server and spec.get('server', True):
+        headers.append(('Server', server))
+
+    if 'file' in spec:
+        with open(os.path.join(directory, spec['file']), 'rb') as f:
+            data = f.read()
+        if spec['file'].endswith('.gz'):
+            return Response(spec['status'], headers, gzipped_body=data)
+    else:
+        data = spec.get('body', '').encode('utf-8')
+
+    if len(data) >= COMPRESS_MIN_SIZE:
+        return Response(spec['status'], headers, gzipped_body=gzip.compress(data, 9, mtime=0))
+    return Response(spec['status'], headers, body=data)
+
+
+class Persona:
+    def __init__(self, directory):
+        with open(os.path.join(directory, 'persona.json')) as f:
+            config = json.load(f)
+
+        self.directory = directory
+        self.name = config.get('name', os.path.basename(directory))
+        self.ports = config.get('ports', [80])
+        self.methods = set(config.get('methods', ['GET', 'POST']))
+        server = config.get('server')
+        self.routes = {path: build_response(directory, spec, server)
+                       for path, spec in config.get('routes', {}).items()}
+        self.default = build_response(directory, config['default'], server)
+        self.method_not_allowed = build_response(
+            directory, config.get('method_not_allowed', {'status': '405 Method Not Allowed', 'server': False}),
+            server)
+
+    def respond(self, request):
+        """ Returns the prebuilt buffer answering `request` """
+        if request.method not in self.methods:
+            return self.method_not_allowed.select(request)
+        return self.routes.get(request.target, self.default).select(request)
+
+
+def load_personas(root, names=None):
+    """ Loads every persona directory under `root`, or only those whose directory or persona name is in `names` """
+    personas = []
+    for entry in sorted(os.listdir(root)):
+        directory = os.path.join(root, entry)
+        if not os.path.isfile(os.path.join(directory, 'persona.json')):
+            continue
+        persona = Persona(directory)
+        if names and entry not in names and persona.name not in names:
+            continue
+        personas.append(persona)
+    return personas
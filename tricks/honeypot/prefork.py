@@ -0,0 +1,230 @@
+# Multi-core prefork mode for the honeypot.
+#
+# A supervisor process forks N workers. Every worker binds its own listening
+# socket to the same host/port with SO_REUSEPORT, so the kernel spreads new
+# connections across the workers and each one runs its own event loop on its
+# own core. A worker that dies is restarted (with a growing delay if it keeps
+# crashing right after start).
+#
+# Workers never write the auth log themselves. Each one gets a Unix socket pair
+# to the supervisor and a LogForwarder that ships JSON lines over it from a
+# background thread; the supervisor collects complete lines from all workers
+# and hands them to the single AuthLogWriter, so records from different
+# workers never interleave and rotation happens in one place.
+
+import json
+import os
+import queue
+import selectors
+import signal
+import socket
+import sys
+import threading
+import time
+
+_STOP = object()
+
+
+class LogForwarder:
+    """ Worker-side replacement for AuthLogWriter that sends records to the supervisor """
+
+    def __init__(self, sock, batch_size=512, queue_size=100000):
+        self.sock = sock
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name='log-forwarder', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def log(self, record):
+        """ Queues a record for the supervisor; never blocks """
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join(timeout=5)
+        self.sock.close()
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            for record in batch:
+                if record is _STOP:
+                    stop = True
+                    continue
+                try:
+                    lines.append(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+                except (TypeError, ValueError) as e:
+                    print(f"Skipping unserializable log record: {e}")
+            try:
+                if lines:
+                    self.sock.sendall(''.join(lines).encode('utf-8', 'backslashreplace'))
+            except OSError as e:
+                print(f"Error sending log records to the supervisor: {e}")
+                return
+
+
+class Supervisor:
+    """ Forks `workers` processes running `serve_worker(index, log)` and keeps them alive.
+
+    `serve_worker` is called in the child with the worker index and a
+    LogForwarder to use instead of the auth log; it should return when the
+    worker is asked to stop. Workers are stopped with SIGTERM, which exits the
+    child until `serve_worker` installs its own handler (e.g. with
+    loop.add_signal_handler), so it can finish open connections and close the
+    LogForwarder. `auth_log` is the supervisor's AuthLogWriter.
+    """
+
+    def __init__(self, workers, serve_worker, auth_log):
+        self.workers = workers
+        self.serve_worker = serve_worker
+        self.auth_log = auth_log
+        self.children = {}  # pid -> worker index
+        self._started = {}  # worker index -> start time
+        self._delay = {}  # worker index -> restart delay
+        self._log_sockets = {}  # worker index -> supervisor end of the log socket pair
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._stopping = False
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGUSR1, self._forward)
+        threading.Thread(target=self._collect_logs, name='log-collector', daemon=True).start()
+
+        for index in range(self.workers):
+            self._spawn(index)
+        print(f"Supervisor {os.getpid()} started {self.workers} workers")
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            index = self.children.pop(pid, None)
+            if index is None:
+                continue
+            if self._stopping:
+                continue
+
+            code = os.waitstatus_to_exitcode(status)
+            print(f"Worker {index} (pid {pid}) exited with status {code}, restarting")
+            if time.monotonic() - self._started[index] < 1.0:
+                self._delay[index] = min(self._delay.get(index, 0.5) * 2, 30.0)
+            else:
+                self._delay[index] = 0.5
+            time.sleep(self._delay[index])
+            if not self._stopping:
+                self._spawn(index)
+
+        # Pick up whatever the workers sent right before exiting
+        with self._lock:
+            for index in list(self._log_sockets):
+                self._close_log_socket(index)
+
+    def _stop(self, signum, frame):
+        if self._stopping:
+            return
+        self._stopping = True
+        self._forward(signal.SIGTERM, frame)
+
+    def _forward(self, signum, frame):
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _spawn(self, index):
+        parent_sock, child_sock = socket.socketpair()
+        with self._lock:
+            # Fork with the lock held so the child sees a consistent socket table
+            pid = os.fork()
+            if pid == 0:
+                code = 0
+                try:
+                    parent_sock.close()
+                    for sock in self._log_sockets.values():
+                        sock.close()
+                    signal.signal(signal.SIGINT, signal.default_int_handler)
+                    signal.signal(signal.SIGTERM, signal.SIG_DFL)  # until the worker installs its own handler
+                    signal.signal(signal.SIGUSR1, signal.SIG_IGN)  # until the worker installs its own handler
+                    self.serve_worker(index, LogForwarder(child_sock).start())
+                except SystemExit as e:
+                    code = e.code if isinstance(e.code, int) else 0
+                except BaseException as e:
+                    print(f"Worker {index} failed: {e!r}")
+                    code = 1
+                finally:
+                    sys.stdout.flush()
+                    os._exit(code)
+
+            child_sock.close()
+            parent_sock.setblocking(False)
+            self._close_log_socket(index)
+            self._log_sockets[index] = parent_sock
+            self._selector.register(parent_sock, selectors.EVENT_READ, bytearray())
+        self.children[pid] = index
+        self._started[index] = time.monotonic()
+
+    def _close_log_socket(self, index):
+        """ Reads what is left in a worker's log socket and closes it; call with the lock held """
+        sock = self._log_sockets.pop(index, None)
+        if sock is None:
+            return
+        self._read(sock, self._selector.get_key(sock).data, drain=True)
+        self._selector.unregister(sock)
+        sock.close()
+
+    def _collect_logs(self):
+        while True:
+            events = self._selector.select(timeout=0.1)
+            with self._lock:
+                live = list(self._log_sockets.values())
+                for key, _ in events:
+                    if key.fileobj not in live:
+                        continue  # closed by _spawn() in the meantime
+                    if not self._read(key.fileobj, key.data):
+                        # The worker is gone; stop polling its socket until it is restarted
+                        for index, sock in list(self._log_sockets.items()):
+                            if sock is key.fileobj:
+                                self._close_log_socket(index)
+
+    def _read(self, sock, pending, drain=False):
+        """ Passes complete lines from `sock` to the auth log; returns False at end of stream """
+        while True:
+            try:
+                data = sock.recv(262144)
+            except (BlockingIOError, InterruptedError):
+                return True
+            except OSError:
+                data = b''
+            if not data:
+                return False
+            pending += data
+            end = pending.rfind(b'\n')
+            if end != -1:
+                for line in bytes(pending[:end]).split(b'\n'):
+                    self.auth_log.log(line.decode('utf-8', 'backslashreplace'))
+                del pending[:end + 1]
+            if not drain:
+                return True
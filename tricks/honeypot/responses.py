@@ -0,0 +1,71 @@
+# Prebuilt HTTP responses for the honeypot.
+#
+# Every response the honeypot can send is rendered once at startup into an
+# immutable byte buffer (status line, headers with the correct Content-Length,
+# and body). Pages that are stored gzipped are also kept as a second, gzip
+# encoded variant which is sent as-is to clients that accept it, so serving a
+# request never decompresses or re-encodes anything. Every variant exists once
+# with `Connection: keep-alive` and once with `Connection: close`.
+
+import gzip
+
+
+def accepts_gzip(accept_encoding):
+    """ Returns True if an Accept-Encoding header value allows a gzip encoded body """
+    if not accept_encoding:
+        return False
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        if coding.strip().lower() not in ('gzip', 'x-gzip'):
+            continue
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+class Response:
+    """ A response rendered once into immutable bytes, optionally with a gzip variant.
+
+    Pass `body` for plain content, or `gzipped_body` for content that is stored
+    gzipped; the identity variant is then decompressed once here.
+    """
+
+    def __init__(self, status, headers=(), body=b'', gzipped_body=None, version='HTTP/1.0'):
+        headers = list(headers)
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        if gzipped_body is not None:
+            body = gzip.decompress(gzipped_body)
+            headers.append(('Vary', 'Accept-Encoding'))
+
+        self.status = status
+        self.identity = {}
+        self.gzip = {}
+        for keep_alive in (False, True):
+            connection = [('Connection', 'keep-alive' if keep_alive else 'close')]
+            self.identity[keep_alive] = memoryview(self._render(version, status, headers + connection, body))
+            if gzipped_body is not None:
+                gzip_headers = headers + [('Content-Encoding', 'gzip')] + connection
+                self.gzip[keep_alive] = memoryview(self._render(version, status, gzip_headers, gzipped_body))
+
+    @staticmethod
+    def _render(version, status, headers, body):
+        lines = [f"{version} {status}"]
+        lines += [f"{name}: {value}" for name, value in headers]
+        lines.append(f"Content-Length: {len(body)}")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+        return head + body
+
+    def select(self, request=None):
+        """ Returns the buffer to send in answer to `request` (an HTTPRequest) """
+        if request is None:
+            return self.identity[False]
+        if self.gzip and accepts_gzip(request.headers.get('accept-encoding')):
+            return self.gzip[request.keep_alive]
+        return self.identity[request.keep_alive]
@@ -0,0 +1,225 @@
+# Asynchronous serving engine for the honeypot scripts in this directory.
+#
+# All connections are handled by one asyncio event loop instead of a serial
+# accept() loop, so a slow or silent client no longer blocks everybody else.
+# Every connection gets its own read and write deadline, and the number of
+# connections served at once is capped: when the cap is reached the engine stops
+# accepting and new clients wait in the kernel backlog until a slot frees up.
+#
+# Requests are read with the incremental parser from httpparse.py within a size
+# and time budget, and HTTP keep-alive connections are kept open for further
+# requests until the client closes them, goes idle or hits `max_requests`. A
+# keep-alive connection on which no byte of a further request arrives within
+# `idle_timeout` is closed cleanly and counted as connections_idle_closed; only
+# requests that stall after they started (or a first request that never comes)
+# count as connections_timed_out and are aborted.
+# Every stage of request handling is timed into `self.metrics` (see metrics.py).
+#
+# close() stops the server gracefully: it stops accepting, closes the listening
+# sockets and lets serve_forever() return once the open connections are done (or
+# after `grace` seconds), so the caller's cleanup (e.g. closing the auth log) runs.
+
+import asyncio
+import errno
+import resource
+import socket
+from time import perf_counter
+
+from .httpparse import ParseError, RequestParser
+from .metrics import Metrics
+
+
+def raise_fd_limit():
+    """ Raises the soft open-files limit to the hard limit and returns the new soft limit """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = hard if hard != resource.RLIM_INFINITY else 65536
+    if soft != resource.RLIM_INFINITY and soft < target:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            soft = target
+        except (ValueError, OSError) as e:
+            print(f"Could not raise the open files limit: {e}")
+    return soft
+
+
+class HoneypotServer:
+    """ Serves many client connections concurrently from a single event loop.
+
+    `handler` is a coroutine function called as `handler(request, client_address, context)`
+    with a parsed HTTPRequest and the `context` given to listen() for the socket
+    the connection came in on (e.g. the persona served there); it returns the response bytes to send back, or
+    None to close the connection without answering. `request.keep_alive` tells
+    the handler whether the connection stays open after the response.
+    """
+
+    def __init__(self, handler, backlog=1024, max_connections=4096,
+                 read_timeout=10.0, write_timeout=10.0, idle_timeout=5.0, recv_size=16384,
+                 max_header_bytes=8192, max_body_bytes=65536, max_requests=100, metrics=None):
+        self.handler = handler
+        self.backlog = backlog
+        self.max_connections = max_connections
+        self.read_timeout = read_timeout
+        self.write_timeout = write_timeout
+        self.idle_timeout = idle_timeout
+        self.recv_size = recv_size
+        self.max_header_bytes = max_header_bytes
+        self.max_body_bytes = max_body_bytes
+        self.max_requests = max_requests
+        self.metrics = metrics or Metrics()
+        self.metrics.add_gauge('connections_in_flight', 'Connections being served', lambda: self.active)
+        self.sockets = []
+        self.active = 0
+        self._slots = None
+        self._tasks = set()
+        self._accept_tasks = []
+        self._closing = False
+        self._grace = 10.0
+
+    def listen(self, host, port, reuse_port=False, context=None):
+        """ Binds a listening socket; call before serve_forever() """
+        family = socket.AF_INET6 if ':' in host else socket.AF_INET
+        server_socket = socket.create_server((host, port), family=family, backlog=self.backlog,
+                                             reuse_port=reuse_port)
+        server_socket.setblocking(False)
+        self.sockets.append((server_socket, context))
+        return server_socket
+
+    async def serve_forever(self):
+        """ Serves until close() is called, then waits for the open connections to finish """
+        self._slots = asyncio.Semaphore(self.max_connections)
+        self._accept_tasks = [asyncio.ensure_future(self._accept_loop(s, context)) for s, context in self.sockets]
+        await asyncio.wait(self._accept_tasks)
+        for task in self._accept_tasks:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+        for server_socket, _ in self.sockets:
+            server_socket.close()
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=self._grace)
+            if pending:
+                print(f"{len(pending)} connections still open after {self._grace}s, closing them")
+                for task in pending:
+                    task.cancel()
+                await asyncio.wait(pending)
+
+    def close(self, grace=10.0):
+        """ Stops accepting connections; serve_forever() returns when the open ones are finished """
+        self._closing = True
+        self._grace = grace
+        for task in self._accept_tasks:
+            task.cancel()
+
+    async def _accept_loop(self, server_socket, context):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            try:
+                client_socket, client_address = await loop.sock_accept(server_socket)
+            except OSError as e:
+                self._slots.release()
+                print(f"Error accepting connection: {e}")
+                if e.errno in (errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.ENOMEM):
+                    # Out of descriptors: back off and let existing connections finish
+                    await asyncio.sleep(0.1)
+                continue
+            self.metrics.inc('connections_accepted')
+            task = loop.create_task(self._serve_client(client_socket, client_address, context, perf_counter()))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _wait_for_next_request(self, reader, parser):
+        """ Waits up to idle_timeout for the first bytes of the next request on a keep-alive connection.
+        Returns False if none arrived (the client is idle or closed the connection). """
+        if parser.has_buffered_data():
+            return True
+        if self._closing:
+            return False
+        try:
+            data = await asyncio.wait_for(reader.read(self.recv_size), self.idle_timeout)
+        except asyncio.TimeoutError:
+            self.metrics.inc('connections_idle_closed')
+            return False
+        if not data:
+            return False
+        parser.feed(data)
+        return True
+
+    async def _read_request(self, reader, parser):
+        """ Reads until the parser has a complete request; the whole request must arrive within read_timeout """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.read_timeout
+        first_data = perf_counter() if parser.has_buffered_data() else None  # when the first bytes arrived
+        parse_time = 0.0
+        while True:
+            started = perf_counter()
+            request = parser.next_request()
+            finished = perf_counter()
+            if first_data is not None or request is not None:
+                parse_time += finished - started
+            if request is not None:
+                self.metrics.observe_stage('parse', parse_time)
+                self.metrics.observe_stage('recv', finished - first_data - parse_time if first_data else 0.0)
+                return request
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            data = await asyncio.wait_for(reader.read(self.recv_size), remaining)
+            if not data:
+                return None
+            if first_data is None:
+                first_data = perf_counter()
+            parser.feed(data)
+
+    async def _serve_client(self, client_socket, client_address, context, accepted_at):
+        self.metrics.observe_stage('accept', perf_counter() - accepted_at)
+        self.active += 1
+        writer = None
+        aborted = False
+        try:
+            reader, writer = await asyncio.open_connection(sock=client_socket)
+            parser = RequestParser(self.max_header_bytes, self.max_body_bytes)
+            served = 0
+            while True:
+                if served and not await self._wait_for_next_request(reader, parser):
+                    break
+                request = await self._read_request(reader, parser)
+                if request is None:
+                    break
+                started = perf_counter()
+                served += 1
+                request.keep_alive = request.keep_alive and served < self.max_requests
+                response = await self.handler(request, client_address, context)
+                if not response:
+                    break
+                sending = perf_counter()
+                writer.write(response)
+                await asyncio.wait_for(writer.drain(), self.write_timeout)
+                finished = perf_counter()
+                self.metrics.observe_stage('send', finished - sending)
+                # "HTTP/1.x NNN ...": the status code is always at the same offset
+                code = bytes(response[9:12]).decode('ascii', 'replace')
+                self.metrics.observe_request(getattr(context, 'name', ''), request.method, request.target,
+                                             code, finished - started)
+                if not request.keep_alive:
+                    break
+        except ParseError:
+            self.metrics.inc('parse_errors')
+            aborted = True
+        except asyncio.TimeoutError:
+            self.metrics.inc('connections_timed_out')
+            aborted = True
+        except (ConnectionError, OSError):
+            self.metrics.inc('connections_reset')
+            aborted = True
+        except Exception as e:
+            print(f"Error handling connection from {client_address}: {e}")
+            aborted = True
+        finally:
+            if writer is None:
+                client_socket.close()
+            elif aborted:
+                writer.transport.abort()
+            else:
+                writer.close()
+            self.active -= 1
+            self._slots.release()